@@ -0,0 +1,68 @@
+"""Decode and process 10k recorded API payloads.
+
+Compares the stdlib JSON decoder with orjson (what Home Assistant's
+json_loads uses) on the full response path: decode the body, then build the
+VehicleRecord. Also times the unchanged-payload path, which only hashes the
+body. Run from the repository root:
+
+    python benchmarks/bench_decode.py [payloads]
+"""
+import hashlib
+import json
+import sys
+import time
+
+from common import load_integration_module, load_payloads
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def make_bodies(count):
+    """Return `count` raw response bodies cycling through the recorded payloads."""
+    responses = [payload["response"] for payload in load_payloads().values()]
+    bodies = []
+    for index in range(count):
+        response = json.loads(json.dumps(responses[index % len(responses)]))
+        response["Data"]["VIN"] = f"{response['Data']['VIN'][:10]}{index:07d}"
+        bodies.append(json.dumps(response, ensure_ascii=False))
+    return bodies
+
+
+def run(label, bodies, handle):
+    started = time.perf_counter()
+    for body in bodies:
+        handle(body)
+    elapsed = time.perf_counter() - started
+    print(f"  {label:32} {elapsed * 1e3:8.1f} ms  {elapsed / len(bodies) * 1e6:7.2f} µs/payload")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    parser = load_integration_module("parser")
+    bodies = make_bodies(count)
+    print(f"{count} payloads, {sum(map(len, bodies)) / count:.0f} characters each")
+
+    run("json.loads", bodies, json.loads)
+    run("json.loads + parse", bodies, lambda body: parser.parse_vehicle_data(json.loads(body)["Data"]))
+    if orjson is not None:
+        run("orjson.loads", bodies, orjson.loads)
+        run(
+            "orjson.loads + parse",
+            bodies,
+            lambda body: parser.parse_vehicle_data(orjson.loads(body)["Data"]),
+        )
+    else:
+        print("  orjson is not installed, skipping")
+    # Same digest as api.hash_payload; an unchanged payload stops here
+    run(
+        "hash only (unchanged payload)",
+        bodies,
+        lambda body: hashlib.blake2b(body.encode(), digest_size=16).hexdigest(),
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Fleet aggregates from the sorted expiry index versus a scan of all vehicles.
+
+Builds an index of N vehicles, then times a single renewal (the update a
+coordinator triggers) and the status counts / next expiring vehicles the
+fleet sensors read, against determine_status() over every vehicle. Run from
+the repository root:
+
+    python benchmarks/bench_expiry_index.py [vehicles]
+"""
+from datetime import date, timedelta
+import random
+import sys
+import time
+
+from common import load_integration_module
+
+TODAY = date(2026, 10, 1)
+
+
+def timed(label, func, repeat=1000):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    elapsed = (time.perf_counter() - started) / repeat
+    print(f"  {label:36} {elapsed * 1e6:9.1f} µs")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    expiry_index = load_integration_module("expiry_index")
+    const = load_integration_module("const")
+    rng = random.Random(0)
+
+    index = expiry_index.ExpiryIndex()
+    fleet = {}
+    for number in range(count):
+        vin = f"TMBIDX{number:011d}"
+        valid_until = TODAY + timedelta(days=rng.randrange(-60, 730)) if rng.random() > 0.01 else None
+        fleet[vin] = valid_until
+        index.update(vin, valid_until, vin)
+    print(f"{count} vehicles, counts {index.counts(TODAY)}")
+
+    vins = list(fleet)
+
+    def renew():
+        vin = rng.choice(vins)
+        index.update(vin, TODAY + timedelta(days=rng.randrange(730)), vin)
+
+    def scan():
+        counts = {}
+        for valid_until in fleet.values():
+            days = (valid_until - TODAY).days if valid_until else None
+            if days is None:
+                status = const.STKStatus.UNKNOWN
+            elif days <= 0:
+                status = const.STKStatus.EXPIRED
+            elif days <= const.STATUS_WARNING_DAYS:
+                status = const.STKStatus.WARNING
+            else:
+                status = const.STKStatus.VALID
+            counts[status] = counts.get(status, 0) + 1
+        return counts, sorted(v for v in fleet.values() if v and v > TODAY)[:10]
+
+    timed("index: one renewal", renew)
+    timed("index: status counts", lambda: index.counts(TODAY))
+    timed("index: next 10 expiring", lambda: index.upcoming(TODAY, 10))
+    timed("scan: counts + next 10", scan, repeat=20)
+
+
+if __name__ == "__main__":
+    main()
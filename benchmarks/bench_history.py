@@ -0,0 +1,99 @@
+"""Fleet reporting queries on the SQLite change history.
+
+Fills a temporary history database with a year of changes for 10k vehicles
+(a baseline per VIN, yearly renewals, owner changes) through the same
+record_changes() the coordinator uses, then times typical report queries.
+Run from the repository root:
+
+    python benchmarks/bench_history.py [vehicles]
+"""
+from dataclasses import replace
+from datetime import date, datetime, timedelta, timezone
+import os
+import random
+import sys
+import tempfile
+import time
+
+from common import load_integration_module, load_payloads
+
+NOW = datetime(2026, 10, 1, tzinfo=timezone.utc)
+
+
+def fill(database, record, count):
+    """Record a baseline and a year of changes per VIN; return the row count."""
+    rng = random.Random(0)
+    rows = 0
+    for index in range(count):
+        vin = f"TMBHIST{index:010d}"
+        first_seen = NOW - timedelta(days=365)
+        current = replace(
+            record,
+            vin=vin,
+            valid_until=date(2026, 1, 1) + timedelta(days=rng.randrange(365)),
+            owners_count=rng.randrange(1, 4),
+        )
+        rows += database.record_changes(vin, None, current, first_seen)
+        # Renewal: the inspection is passed shortly before the old expiry
+        renewed_at = datetime.combine(current.valid_until, datetime.min.time(), timezone.utc)
+        renewed_at -= timedelta(days=rng.randrange(1, 30))
+        if renewed_at < NOW:
+            renewed = replace(current, valid_until=current.valid_until + timedelta(days=730))
+            rows += database.record_changes(vin, current, renewed, renewed_at)
+            current = renewed
+        if rng.random() < 0.1:
+            sold = replace(current, owners_count=current.owners_count + 1)
+            rows += database.record_changes(vin, current, sold, NOW - timedelta(days=rng.randrange(365)))
+    return rows
+
+
+def run(label, query, repeat=20):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = query()
+    elapsed = (time.perf_counter() - started) / repeat
+    print(f"  {label:44} {elapsed * 1e3:7.2f} ms  {len(result):6} rows")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    history = load_integration_module("history")
+    parser = load_integration_module("parser")
+    record = parser.parse_vehicle_data(load_payloads()["passenger_car"]["response"]["Data"])
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "history.db")
+        database = history.HistoryDatabase(path)
+        started = time.perf_counter()
+        rows = fill(database, record, count)
+        elapsed = time.perf_counter() - started
+        print(
+            f"{count} vehicles, {rows} rows, {os.path.getsize(path) / 2**20:.1f} MB,"
+            f" filled in {elapsed:.1f} s ({elapsed / count * 1e6:.0f} µs/vehicle)"
+        )
+
+        quarter_start = NOW - timedelta(days=92)
+        run(
+            "renewals last quarter",
+            lambda: database.query(renewals=True, since=quarter_start, until=NOW, limit=100_000),
+        )
+        run(
+            "history of one VIN",
+            lambda: database.query(vin=f"TMBHIST{count // 2:010d}"),
+        )
+        run(
+            "expiring in November 2026",
+            lambda: database.query(
+                field="valid_until", valid_from=date(2026, 11, 1), valid_to=date(2026, 11, 30),
+                limit=100_000,
+            ),
+        )
+        run(
+            "owner changes, newest 100",
+            lambda: database.query(field="owners_count", limit=100),
+        )
+        database.close()
+
+
+if __name__ == "__main__":
+    main()
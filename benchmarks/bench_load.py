@@ -0,0 +1,180 @@
+"""Full fleet refresh against a local mock of the API.
+
+Drives the real STKczechrDataUpdateCoordinator (shared session, token
+bucket, single flight, parser) for fleets of 10, 100 and 1,000 VINs against
+benchmarks/mock_api.py, which enforces the per-key quota with 429 responses
+and injects latency and server errors. Reports the time until every VIN
+holds data, the 429 rate, peak memory and event-loop lag.
+
+Needs Home Assistant (and so aiohttp) installed. Time is compressed: the
+27 requests/min quota becomes 27 requests per 60 / --time-scale seconds,
+for the mock and the client limiter alike. Run from the repository root:
+
+    python benchmarks/bench_load.py [--fleets 10 100 1000] [--error-rate 0.02]
+"""
+import argparse
+import asyncio
+import logging
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from common import ROOT
+from mock_api import MockDataovozidlechApi
+
+sys.path.insert(0, str(ROOT))
+
+from homeassistant.core import HomeAssistant  # noqa: E402
+
+from custom_components.stk_czechr import api  # noqa: E402
+from custom_components.stk_czechr.const import (  # noqa: E402
+    API_RATE_LIMIT,
+    API_RATE_PERIOD,
+    DATA_RATE_LIMITERS,
+    DOMAIN,
+)
+from custom_components.stk_czechr.coordinator import STKczechrDataUpdateCoordinator  # noqa: E402
+from custom_components.stk_czechr.models import VehicleRecord  # noqa: E402
+from custom_components.stk_czechr.rate_limiter import TokenBucketRateLimiter  # noqa: E402
+
+API_KEY = "benchmark-key"
+
+
+class LoopLagMonitor:
+    """Measure how late a periodic 10 ms sleep wakes up."""
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.lags = []
+        self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            self.lags.append(loop.time() - started - self.interval)
+
+    def start(self):
+        self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+    def summary(self):
+        if not self.lags:
+            return 0.0, 0.0
+        lags = sorted(self.lags)
+        return lags[int(len(lags) * 0.99) - 1] * 1e3, lags[-1] * 1e3
+
+
+async def run_fleet(count, args):
+    """Refresh `count` VINs until each holds a VehicleRecord; return the report."""
+    period = API_RATE_PERIOD / args.time_scale
+    mock = MockDataovozidlechApi(
+        rate=API_RATE_LIMIT,
+        period=period,
+        latency=(args.latency_min / 1e3, args.latency_max / 1e3),
+        error_rate=args.error_rate,
+        seed=count,
+    )
+    url = await mock.async_start()
+
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass = HomeAssistant(config_dir)
+        api.API_BASE_URL = url
+        hass.data.setdefault(DOMAIN, {})[DATA_RATE_LIMITERS] = {
+            API_KEY: TokenBucketRateLimiter(args.client_rate, period)
+        }
+        api.async_acquire_api_session(hass)
+        coordinators = [
+            STKczechrDataUpdateCoordinator(hass, f"Vehicle {index}", f"TMBBENCH{index:09d}", API_KEY)
+            for index in range(count)
+        ]
+
+        monitor = LoopLagMonitor()
+        tracemalloc.start()
+        monitor.start()
+        started = time.perf_counter()
+
+        pending = coordinators
+        sweeps = 0
+        while pending:
+            sweeps += 1
+            await asyncio.gather(*(coordinator.async_refresh() for coordinator in pending))
+            # Failed VINs are retried right away instead of after their
+            # (uncompressed) backoff; the limiter is already paused on 429
+            pending = [c for c in pending if not isinstance(c.data, VehicleRecord)]
+
+        elapsed = time.perf_counter() - started
+        await monitor.stop()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        await api.async_release_api_session(hass)
+    await mock.async_stop()
+
+    lag_p99, lag_max = monitor.summary()
+    return {
+        "vins": count,
+        "elapsed": elapsed,
+        "sweeps": sweeps,
+        "requests": mock.requests,
+        "rate_429": mock.status_counts[429] / mock.requests,
+        "errors_5xx": sum(n for status, n in mock.status_counts.items() if status >= 500),
+        "peak_mb": peak / 2**20,
+        "lag_p99_ms": lag_p99,
+        "lag_max_ms": lag_max,
+    }
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--fleets", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument(
+        "--time-scale", type=float, default=60.0, help="quota period is 60 s divided by this"
+    )
+    parser.add_argument(
+        "--client-rate",
+        type=int,
+        default=API_RATE_LIMIT,
+        help="client limiter tokens per period; above the quota to provoke 429s",
+    )
+    parser.add_argument("--latency-min", type=float, default=20.0, help="ms")
+    parser.add_argument("--latency-max", type=float, default=150.0, help="ms")
+    parser.add_argument("--error-rate", type=float, default=0.02, help="share of 5xx responses")
+    return parser.parse_args()
+
+
+async def main():
+    args = parse_args()
+    # The coordinator logs every 429 and 5xx; keep the report readable
+    logging.basicConfig(level=logging.CRITICAL)
+    period = API_RATE_PERIOD / args.time_scale
+    print(
+        f"quota {API_RATE_LIMIT}/{period:g} s, client limiter {args.client_rate}/{period:g} s, "
+        f"latency {args.latency_min:g}-{args.latency_max:g} ms, {args.error_rate:.0%} 5xx"
+    )
+    print(
+        f"  {'VINs':>5} {'time':>9} {'real':>9} {'sweeps':>6} {'requests':>8} {'429':>6} "
+        f"{'5xx':>4} {'peak':>8} {'lag p99':>8} {'lag max':>8}"
+    )
+    for count in args.fleets:
+        report = await run_fleet(count, args)
+        print(
+            f"  {report['vins']:>5} {report['elapsed']:>7.2f} s"
+            # Wall time of the same refresh under the real 27/min quota
+            f" {report['elapsed'] * args.time_scale / 60:>6.1f} min"
+            f" {report['sweeps']:>6} {report['requests']:>8} {report['rate_429']:>6.1%}"
+            f" {report['errors_5xx']:>4} {report['peak_mb']:>5.1f} MB"
+            f" {report['lag_p99_ms']:>5.1f} ms {report['lag_max_ms']:>5.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,38 @@
+"""Micro-benchmark of the table-driven parser against recorded API payloads.
+
+Each payload in payloads/ holds a recorded API response and the expected
+record; outputs are checked against it before timing. Run from the
+repository root:
+
+    python benchmarks/bench_parser.py [iterations]
+"""
+import sys
+import timeit
+
+from common import load_integration_module, load_payloads
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    parser = load_integration_module("parser")
+    payloads = load_payloads()
+
+    for name, payload in payloads.items():
+        record = parser.parse_vehicle_data(payload["response"]["Data"])
+        if record.as_dict() != payload["expected"]:
+            mismatched = {
+                field: (value, payload["expected"].get(field))
+                for field, value in record.as_dict().items()
+                if value != payload["expected"].get(field)
+            }
+            raise SystemExit(f"{name}: output differs from golden record: {mismatched}")
+
+    print(f"{len(payloads)} golden payloads match")
+    for name, payload in payloads.items():
+        data = payload["response"]["Data"]
+        seconds = timeit.timeit(lambda: parser.parse_vehicle_data(data), number=iterations)
+        print(f"  {name:15} {seconds / iterations * 1e6:7.2f} µs/payload")
+
+
+if __name__ == "__main__":
+    main()
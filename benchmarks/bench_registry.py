@@ -0,0 +1,211 @@
+"""Import of a synthetic registry export into the offline VIN index.
+
+Writes a semicolon separated CSV with the Czech column labels of the
+open-data export (Czech dates, quoted multi-line tyre fields, repeated and
+empty VINs), imports it with build_registry() and reports throughput,
+resident memory and the size of the index. The import runs in a thread
+executor next to an asyncio event loop, like the import_registry service,
+and the loop's tick lag is reported. Then times VIN lookups and checks that
+every looked up record equals the API parser's output for the same raw
+values. Small chunks exercise the record boundary detection, since
+the multi-line fields put newlines inside quotes. Run from the repository
+root:
+
+    python benchmarks/bench_registry.py [--rows 200000] [--workers 4] [--chunk-mb 16]
+"""
+import argparse
+import asyncio
+import csv
+from datetime import date, timedelta
+from functools import partial
+import os
+import random
+import resource
+import tempfile
+import time
+
+from common import load_integration_module
+
+# Export column label -> raw API field
+COLUMNS = {
+    "PČV": None,
+    "Tovární značka": "TovarniZnacka",
+    "Obchodní označení": "ObchodniOznaceni",
+    "VIN": "VIN",
+    "Barva": "VozidloKaroserieBarva",
+    "Kategorie vozidla": "Kategorie",
+    "Druh vozidla": "VozidloDruh",
+    "Datum 1. registrace": "DatumPrvniRegistrace",
+    "Datum 1. registrace v ČR": "DatumPrvniRegistraceVCr",
+    "Pravidelná technická prohlídka do": "PravidelnaTechnickaProhlidkaDo",
+    "Číslo TP": "CisloTp",
+    "Číslo ORV": "CisloOrv",
+    "Zdvihový objem [cm3]": "MotorZdvihObjem",
+    "Max. výkon [kW] / otáčky": "MotorMaxVykon",
+    "Palivo": "Palivo",
+    "Nejvyšší rychlost [km/h]": "NejvyssiRychlost",
+    "Provozní hmotnost": "HmotnostiProvozni",
+    "Největší povolená hmotnost": "HmotnostiPripPov",
+    "Rozměry": "Rozmery",
+    "Rozvor": "RozmeryRozvor",
+    "Spotřeba na 100 km": "SpotrebaNa100Km",
+    "Emise CO2": "EmiseCO2",
+    "Hluk stojící / otáčky": "HlukStojiciOtacky",
+    "Hluk jízda": "HlukJizda",
+    "Nápravy pneu ráfky": "NapravyPneuRafky",
+    "Počet vlastníků": "PocetVlastniku",
+    "Počet provozovatelů": "PocetProvozovatelu",
+    "Status": "StatusNazev",
+}
+# Interval of the event loop ticks measured during the import
+TICK = 0.01  # seconds
+BRANDS = (("ŠKODA", "OCTAVIA"), ("VOLKSWAGEN", "GOLF"), ("HYUNDAI", "I30"), ("DACIA", "DUSTER"))
+
+
+def vin(index):
+    return f"TMBREG{index:011d}"
+
+
+def raw_row(rng, index, valid_until):
+    """Return the raw API fields of one synthetic vehicle."""
+    brand, model = rng.choice(BRANDS)
+    registered = date(2005, 1, 1) + timedelta(days=rng.randrange(7000))
+    return {
+        "TovarniZnacka": brand,
+        "ObchodniOznaceni": model,
+        "VIN": vin(index),
+        "VozidloKaroserieBarva": rng.choice(("ŠEDÁ", "BÍLÁ", "ČERNÁ", "MODRÁ")),
+        "Kategorie": "M1",
+        "VozidloDruh": "OSOBNÍ AUTOMOBIL",
+        "DatumPrvniRegistrace": f"{registered.day}.{registered.month}.{registered.year}",
+        "DatumPrvniRegistraceVCr": registered.isoformat(),
+        "PravidelnaTechnickaProhlidkaDo": f"{valid_until.day}.{valid_until.month}.{valid_until.year}",
+        "CisloTp": f"UI{index:06d}",
+        "CisloOrv": f"UBB{index:06d}",
+        "MotorZdvihObjem": str(rng.choice((999, 1395, 1598, 1968))),
+        "MotorMaxVykon": f"{rng.randrange(50, 150)}/ 3500-4000",
+        "Palivo": rng.choice(("BA 95 B", "NM")),
+        "NejvyssiRychlost": str(rng.randrange(160, 240)),
+        "HmotnostiProvozni": str(rng.randrange(1000, 1600)),
+        "HmotnostiPripPov": str(rng.randrange(1500, 2200)),
+        "Rozmery": f"{rng.randrange(3900, 4900)}/ 1814/ 1461",
+        "RozmeryRozvor": "2680",
+        "SpotrebaNa100Km": f"{rng.randrange(5, 9)},4/ 3,9/ 4,4",
+        "EmiseCO2": f"142/ 102/ {rng.randrange(90, 180)}",
+        "HlukStojiciOtacky": "75/ 3000",
+        "HlukJizda": "71",
+        "NapravyPneuRafky": "205/55 R16 91V/ 6.5J x 16;\n205/55 R16 91V/ 6.5J x 16;\n",
+        "PocetVlastniku": str(rng.randrange(1, 5)),
+        "PocetProvozovatelu": str(rng.randrange(1, 5)),
+        "StatusNazev": "PROVOZOVANÉ",
+    }
+
+
+def write_export(path, count):
+    """Write `count` rows; return {VIN: raw fields of the row the index keeps}."""
+    rng = random.Random(0)
+    expected = {}
+    with open(path, "w", encoding="utf-8", newline="") as export:
+        writer = csv.writer(export, delimiter=";")
+        writer.writerow(COLUMNS)
+        for index in range(count):
+            if index % 1000 == 999:
+                writer.writerow([""] * len(COLUMNS))  # row without a VIN
+                continue
+            valid_until = date(2026, 1, 1) + timedelta(days=rng.randrange(730))
+            raw = raw_row(rng, index, valid_until)
+            if index % 100 == 99:
+                # The same VIN again, with an older inspection: must not win
+                older = raw_row(rng, index, valid_until - timedelta(days=730))
+                writer.writerow([older.get(field, "") for field in COLUMNS.values()])
+            writer.writerow([raw.get(field, str(index)) for field in COLUMNS.values()])
+            if index < 10_000:
+                expected[vin(index)] = raw
+    return expected
+
+
+async def import_next_to_loop(build):
+    """Run build() in the executor; return its result and the lag of each loop tick."""
+    loop = asyncio.get_running_loop()
+    future = loop.run_in_executor(None, build)
+    lags = []
+    while not future.done():
+        started = loop.time()
+        await asyncio.sleep(TICK)
+        lags.append(loop.time() - started - TICK)
+    return await future, lags
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--chunk-mb", type=float, default=16)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    count = args.rows
+    registry = load_integration_module("registry")
+    parser = load_integration_module("parser")
+
+    with tempfile.TemporaryDirectory() as directory:
+        csv_path = os.path.join(directory, "export.csv")
+        database_path = os.path.join(directory, "registry.db")
+        expected = write_export(csv_path, count)
+        size = os.path.getsize(csv_path)
+        print(f"export: {count} rows, {size / 2**20:.0f} MB")
+
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        stats, lags = asyncio.run(
+            import_next_to_loop(
+                partial(
+                    registry.build_registry,
+                    csv_path,
+                    database_path,
+                    workers=args.workers,
+                    chunk_size=int(args.chunk_mb * 2**20),
+                    progress=lambda done, total, rows: print(
+                        f"  {done / total:4.0%} {rows:>10} rows", end="\r", flush=True
+                    ),
+                )
+            )
+        )
+        rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        print(" " * 30, end="\r")
+        print(
+            f"imported {stats['vehicles']} vehicles ({stats['skipped']} rows skipped)"
+            f" in {stats['elapsed']} s: {stats['rows_per_second']} rows/s,"
+            f" {stats['megabytes_per_second']} MB/s"
+        )
+        print(
+            f"{stats['chunks']} chunks, {args.workers} workers:"
+            f" normalize {stats['normalize_seconds']} s, merge {stats['merge_seconds']} s"
+        )
+        lags.sort()
+        print(
+            f"event loop: {len(lags)} ticks of {TICK * 1000:.0f} ms,"
+            f" {sum(lag < TICK for lag in lags) / len(lags):.0%} late by less than a tick,"
+            f" lag p99 {lags[int(len(lags) * 0.99)] * 1000:.1f} ms, max {lags[-1] * 1000:.1f} ms"
+        )
+        print(
+            f"peak RSS growth {(rss_after - rss_before) / 1024:.0f} MB,"
+            f" index {os.path.getsize(database_path) / 2**20:.0f} MB"
+            f" ({os.path.getsize(database_path) / stats['vehicles']:.0f} B/vehicle)"
+        )
+
+        database = registry.RegistryDatabase(database_path)
+        vins = list(expected)
+        started = time.perf_counter()
+        for vin_to_check in vins:
+            record = database.lookup(vin_to_check)
+            if record != parser.parse_vehicle_data(expected[vin_to_check]):
+                raise SystemExit(f"Record of {vin_to_check} differs from the parser output")
+        elapsed = time.perf_counter() - started
+        print(f"lookup + verify: {elapsed / len(vins) * 1e6:.0f} µs/VIN ({len(vins)} VINs)")
+        database.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Cost of writing the state of every sensor of a vehicle, logging at INFO.
+
+Writes all sensors of one vehicle repeatedly, once with a fetched record
+and once while the coordinator holds an error, and reports the time per
+state write and the log lines produced. Needs Home Assistant installed.
+Run from the repository root:
+
+    python benchmarks/bench_state_write.py [rounds]
+"""
+import asyncio
+import io
+import logging
+import sys
+import tempfile
+import time
+
+from common import ROOT, load_payloads
+
+sys.path.insert(0, str(ROOT))
+
+from homeassistant.core import HomeAssistant  # noqa: E402
+
+from custom_components.stk_czechr.const import SENSOR_TYPES  # noqa: E402
+from custom_components.stk_czechr.coordinator import STKczechrDataUpdateCoordinator  # noqa: E402
+from custom_components.stk_czechr.parser import parse_vehicle_data  # noqa: E402
+from custom_components.stk_czechr.sensor import STKczechrSensor  # noqa: E402
+
+
+def make_sensors(hass, coordinator):
+    sensors = []
+    for sensor_type in SENSOR_TYPES:
+        sensor = STKczechrSensor(coordinator, sensor_type)
+        sensor.hass = hass
+        sensor.entity_id = f"sensor.bench_{sensor_type}"
+        sensors.append(sensor)
+    # Home Assistant warns once per entity added without a platform
+    logging.disable(logging.WARNING)
+    for sensor in sensors:
+        sensor.async_write_ha_state()
+    logging.disable(logging.NOTSET)
+    return sensors
+
+
+def run(label, sensors, rounds, log):
+    log.seek(0)
+    log.truncate()
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for sensor in sensors:
+            sensor.async_write_ha_state()
+    elapsed = time.perf_counter() - started
+    writes = rounds * len(sensors)
+    lines = log.getvalue().count("\n")
+    print(
+        f"  {label:10} {elapsed / writes * 1e6:8.2f} µs/write"
+        f"  {lines / rounds:6.1f} log lines per vehicle update"
+    )
+
+
+async def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    log = io.StringIO()
+    logging.basicConfig(level=logging.INFO, handlers=[logging.NullHandler()])
+    # Only lines of the integration are counted
+    logging.getLogger("custom_components.stk_czechr").addHandler(logging.StreamHandler(log))
+
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass = HomeAssistant(config_dir)
+        coordinator = STKczechrDataUpdateCoordinator(hass, "Bench", "TMBJJ7NE8L0123456", "key")
+        sensors = make_sensors(hass, coordinator)
+        print(f"{len(sensors)} sensors, {rounds} updates, logging at INFO")
+
+        record = parse_vehicle_data(load_payloads()["passenger_car"]["response"]["Data"])
+        coordinator.data = record
+        run("record", sensors, rounds, log)
+        coordinator.data = {"error": "API request failed: 503", "status": 503}
+        run("error", sensors, rounds, log)
+        await hass.async_stop(force=True)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,92 @@
+"""Memory and read benchmark: VehicleRecord vs. the former per-VIN dict.
+
+Run from the repository root:
+
+    python benchmarks/bench_vehicle_record.py [vehicles]
+"""
+from dataclasses import fields
+from datetime import date
+import sys
+import timeit
+import tracemalloc
+
+from common import load_integration_module
+
+
+def sample_values(index):
+    """Return processed values of one vehicle, as _process_api_data builds them."""
+    return {
+        "valid_until": date(2026, 1 + index % 12, 1 + index % 28),
+        "brand": "ŠKODA",
+        "model": f"OCTAVIA {index}",
+        "vin": f"TMBJJ7NE0J{index:07d}",
+        "color": "ŠEDÁ",
+        "weight": 1320.0 + index % 100,
+        "max_weight": 1900.0,
+        "max_speed": 210.0,
+        "engine_displacement": 1968.0,
+        "wheelbase": 2680.0,
+        "noise_driving": 71.0,
+        "owners_count": float(index % 4),
+        "operators_count": float(index % 3),
+        "tp_number": f"UI{index:06d}",
+        "orv_number": f"UB{index:06d}",
+        "engine_power": "110/ 3500-4000",
+        "fuel_type": "NM",
+        "vehicle_type": "OSOBNÍ AUTOMOBIL",
+        "category": "M1",
+        "status_name": "PROVOZOVANÉ",
+        "first_registration": date(2018, 3, 1),
+        "first_registration_cz": date(2018, 3, 1),
+        "length": 4689.0,
+        "width": 1814.0,
+        "height": 1461.0,
+        "consumption_city": 4.4,
+        "consumption_highway": 4.4,
+        "consumption_combined": 4.4,
+        "co2_emissions": 115.0,
+        "noise_stationary": 75.0,
+        "tires_front": "205/55 R16 91V/ 6.5J x 16",
+        "tires_rear": "205/55 R16 91V/ 6.5J x 16",
+        "dimensions": "4689/ 1814/ 1461",
+    }
+
+
+def measure(build, count):
+    """Return (bytes allocated, objects) for `count` vehicles."""
+    values = [sample_values(index) for index in range(count)]
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    objects = [build(value) for value in values]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    size = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    return size, objects
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    models = load_integration_module("models")
+    record_fields = [field.name for field in fields(models.VehicleRecord)]
+
+    dict_size, dicts = measure(dict, count)
+    record_size, records = measure(lambda values: models.VehicleRecord(**values), count)
+
+    print(f"{count} vehicles, {len(record_fields)} fields each")
+    print(f"  dict          {dict_size / count:8.0f} B/vehicle  {dict_size / 2**20:8.2f} MiB")
+    print(f"  VehicleRecord {record_size / count:8.0f} B/vehicle  {record_size / 2**20:8.2f} MiB")
+    print(f"  saved         {1 - record_size / dict_size:8.1%}")
+
+    # One state write reads every field once
+    dict_read = timeit.timeit(
+        lambda: [data.get(name) for data in dicts[:1000] for name in record_fields], number=20
+    )
+    record_read = timeit.timeit(
+        lambda: [getattr(data, name) for data in records[:1000] for name in record_fields], number=20
+    )
+    print(f"  read all fields of 1000 vehicles: dict {dict_read / 20 * 1e3:.2f} ms, "
+          f"VehicleRecord {record_read / 20 * 1e3:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
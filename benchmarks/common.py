@@ -0,0 +1,33 @@
+"""Shared helpers for the STK czechr benchmarks."""
+import importlib
+import importlib.util
+import json
+from pathlib import Path
+import sys
+
+ROOT = Path(__file__).parents[1]
+PACKAGE_PATH = ROOT / "custom_components" / "stk_czechr"
+PAYLOADS_PATH = Path(__file__).parent / "payloads"
+PACKAGE = "stk_czechr"
+
+
+def load_integration_module(name):
+    """Import a submodule of the integration without running its __init__.
+
+    Modules such as models and parser only need the standard library, so the
+    pure data benchmarks run without Home Assistant installed.
+    """
+    if PACKAGE not in sys.modules:
+        spec = importlib.util.spec_from_file_location(
+            PACKAGE, PACKAGE_PATH / "__init__.py", submodule_search_locations=[str(PACKAGE_PATH)]
+        )
+        sys.modules[PACKAGE] = importlib.util.module_from_spec(spec)
+    return importlib.import_module(f"{PACKAGE}.{name}")
+
+
+def load_payloads():
+    """Return the recorded API payloads as {name: {"response": ..., "expected": ...}}."""
+    return {
+        path.stem: json.loads(path.read_text(encoding="utf-8"))
+        for path in sorted(PAYLOADS_PATH.glob("*.json"))
+    }
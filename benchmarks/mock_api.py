@@ -0,0 +1,105 @@
+"""Local mock of the dataovozidlech.cz vehicle technical data API.
+
+Serves /api/vehicletechnicaldata/v2 with recorded Status/Data payloads,
+enforces a per-key quota in a sliding window (429 with Retry-After) and
+injects latency and server errors.
+"""
+import asyncio
+from collections import defaultdict, deque
+import math
+import random
+import time
+
+from aiohttp import web
+
+from common import load_payloads
+
+API_PATH = "/api/vehicletechnicaldata/v2"
+
+
+class MockDataovozidlechApi:
+    """aiohttp server imitating the vehicle technical data endpoint."""
+
+    def __init__(
+        self,
+        rate=27,
+        period=60.0,
+        latency=(0.05, 0.25),
+        error_rate=0.0,
+        seed=None,
+        valid_keys=None,
+    ):
+        """Initialize; `rate` requests per `period` seconds are allowed per API key.
+
+        With `valid_keys`, any other key is rejected with 401.
+        """
+        self.rate = rate
+        self.period = period
+        self.latency = latency
+        self.error_rate = error_rate
+        self.valid_keys = valid_keys
+        self._random = random.Random(seed)
+        self._windows = defaultdict(deque)
+        self._responses = [payload["response"] for payload in load_payloads().values()]
+        self._runner = None
+        self.url = None
+        self.status_counts = defaultdict(int)
+
+    @property
+    def requests(self):
+        """Return the number of requests served."""
+        return sum(self.status_counts.values())
+
+    async def async_start(self, host="127.0.0.1", port=0):
+        """Start serving on a free port and return the endpoint URL."""
+        app = web.Application()
+        app.router.add_get(API_PATH, self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = self._runner.addresses[0][1]
+        self.url = f"http://{host}:{port}{API_PATH}"
+        return self.url
+
+    async def async_stop(self):
+        """Stop the server."""
+        if self._runner:
+            await self._runner.cleanup()
+
+    def _respond(self, status, **kwargs):
+        self.status_counts[status] += 1
+        if status == 200:
+            return web.json_response(kwargs.pop("data"), status=status, **kwargs)
+        return web.Response(status=status, **kwargs)
+
+    def _quota_exceeded(self, api_key):
+        """Record a request; return seconds to wait when the quota is exhausted."""
+        window = self._windows[api_key]
+        now = time.monotonic()
+        while window and now - window[0] >= self.period:
+            window.popleft()
+        if len(window) >= self.rate:
+            return self.period - (now - window[0])
+        window.append(now)
+        return None
+
+    async def _handle(self, request):
+        """Serve one request."""
+        api_key = request.headers.get("API_KEY")
+        if not api_key or (self.valid_keys is not None and api_key not in self.valid_keys):
+            return self._respond(401)
+
+        retry_after = self._quota_exceeded(api_key)
+        if retry_after is not None:
+            return self._respond(429, headers={"Retry-After": str(math.ceil(retry_after))})
+
+        await asyncio.sleep(self._random.uniform(*self.latency))
+        if self._random.random() < self.error_rate:
+            return self._respond(self._random.choice((500, 502, 503)))
+
+        vin = request.query.get("vin", "")
+        response = self._responses[hash(vin) % len(self._responses)]
+        data = {**response, "Data": {**response["Data"], "VIN": vin}}
+        return self._respond(200, data=data)
+
@@ -1,22 +1,86 @@
 """The STK czechr integration."""
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
-from homeassistant.const import CONF_NAME
-from homeassistant.components.http import HomeAssistantView
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.discovery import async_load_platform
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.helpers.event import async_track_time_change
+from homeassistant.const import CONF_NAME, EVENT_HOMEASSISTANT_STOP
+from homeassistant.components.http import KEY_HASS, HomeAssistantView
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+import homeassistant.helpers.config_validation as cv
 from aiohttp import web
-import aiohttp
-import async_timeout
-import json
 import logging
+import sqlite3
+import voluptuous as vol
 
-from .const import DOMAIN, CONF_VIN, CONF_API_KEY, API_BASE_URL, API_TIMEOUT
+from .cache import STKczechrCache, async_get_cache
+from .api import (
+    async_acquire_api_session,
+    async_get_api_session,
+    async_get_single_flight,
+    async_release_api_session,
+    json_loads,
+    async_request_vehicle,
+)
+from .const import (
+    DOMAIN,
+    DATA_CACHE,
+    DATA_HISTORY,
+    DATA_RATE_LIMITERS,
+    DATA_REGISTRY,
+    HISTORY_DATABASE,
+    REGISTRY_DATABASE,
+    SIGNAL_DAY_CHANGED,
+    CONF_VIN,
+    CONF_API_KEY,
+    CONF_PROMETHEUS,
+    CONF_API_KEYS,
+)
+from .services import async_setup_services
+from .coordinator import (
+    STKczechrDataUpdateCoordinator,
+    async_get_fleet_coordinator,
+    async_get_vehicle_coordinators,
+    async_rebalance_fleets,
+    async_remove_fleet_vehicle,
+)
+from .expiry import STKExpiryTracker
+from .history import HistoryDatabase, STKHistory
+from .key_pool import async_get_key_pool
+from .metrics import async_get_metrics, render_prometheus
+from .models import VehicleRecord
+from .rate_limiter import async_get_rate_limiter
+from .registry import RegistryDatabase, STKRegistry
+from .util import normalize_vin
 
 _LOGGER = logging.getLogger(__name__)
 
 PLATFORMS: list[str] = ["sensor"]
 
+CONFIG_SCHEMA = vol.Schema(
+    {
+        DOMAIN: vol.All(
+            # A bare "stk_czechr:" key has no value; it gets the defaults
+            lambda value: value or {},
+            vol.Schema(
+                {
+                    vol.Optional(CONF_PROMETHEUS, default=False): cv.boolean,
+                    vol.Optional(CONF_API_KEYS, default=[]): vol.All(cv.ensure_list, [cv.string]),
+                }
+            ),
+        )
+    },
+    extra=vol.ALLOW_EXTRA,
+)
+
 class STKApiDebugView(HomeAssistantView):
-    """View to handle API debug requests."""
+    """View to handle API debug requests.
+
+    By default the view answers from the coordinator cache without any API
+    call. With "live": true it performs a real request with one of the
+    configured API keys, which waits for a token of that key's rate limiter
+    and joins a fetch of the same VIN and key that is already in flight.
+    """
 
     url = "/api/stk_czechr/debug"
     name = "api:stk_czechr:debug"
@@ -25,65 +89,186 @@ class STKApiDebugView(HomeAssistantView):
         """Handle debug API request."""
         try:
             data = await request.json()
-            vin = data.get("vin")
+            vin = normalize_vin(data.get("vin"))
             api_key = data.get("api_key")
+            live = bool(data.get("live", False))
             
-            if not vin or not api_key:
+            if not vin:
                 return web.json_response({
-                    "error": "Missing VIN or API key"
+                    "error": "Missing VIN"
                 }, status=400)
             
-            # Make API call
-            headers = {
-                "API_KEY": api_key,
-                "Content-Type": "application/json",
-                "User-Agent": "HomeAssistant-STK-czechr-Debug/0.4.3"
+            hass = request.app[KEY_HASS]
+            coordinators = async_get_vehicle_coordinators(hass, vin)
+
+            if not live:
+                if not coordinators:
+                    return web.json_response({
+                        "error": "VIN is not configured, use \"live\": true to query the API"
+                    }, status=404)
+                coordinator = coordinators[0]
+                cached = coordinator.data
+                return web.json_response({
+                    "source": "cache",
+                    "vin": vin,
+                    "last_fetch": coordinator.last_fetch.isoformat() if coordinator.last_fetch else None,
+                    "retry": coordinator.retry.as_dict(),
+                    "data": cached.as_dict() if isinstance(cached, VehicleRecord) else cached,
+                })
+
+            api_key = api_key or (coordinators[0].api_key if coordinators else None)
+            if not api_key:
+                return web.json_response({
+                    "error": "Missing API key"
+                }, status=400)
+            # Every key has a limiter kept for the lifetime of Home Assistant,
+            # so only keys of the pool are accepted
+            if api_key not in async_get_key_pool(hass):
+                return web.json_response({
+                    "error": "API key is not configured"
+                }, status=403)
+
+            session = async_get_api_session(hass) or async_get_clientsession(hass)
+            limiter = async_get_rate_limiter(hass, api_key)
+
+            async def _async_fetch():
+                await limiter.acquire()
+                return await async_request_vehicle(session, vin, api_key, async_get_metrics(hass))
+
+            response = await async_get_single_flight(hass).async_run((vin, api_key), _async_fetch)
+
+            response_data = {
+                "source": "live",
+                "status": response.status,
+                "headers": dict(response.headers),
+                "url": response.url,
+                "raw_text": response.text,
             }
             
-            url = f"{API_BASE_URL}?vin={vin}"
+            if response.status == 200:
+                try:
+                    # The body was read once as text; decode it from there
+                    response_data["data"] = json_loads(response.text)
+                except ValueError as e:
+                    response_data["error"] = f"JSON parsing failed: {str(e)}"
+            else:
+                response_data["error"] = f"HTTP {response.status}"
             
-            async with aiohttp.ClientSession() as session:
-                async with async_timeout.timeout(API_TIMEOUT):
-                    response = await session.get(url, headers=headers)
-                    
-                    response_data = {
-                        "status": response.status,
-                        "headers": dict(response.headers),
-                        "url": str(response.url)
-                    }
-                    
-                    if response.status == 200:
-                        try:
-                            json_data = await response.json()
-                            response_data["data"] = json_data
-                            response_data["raw_text"] = await response.text()
-                        except Exception as e:
-                            response_data["error"] = f"JSON parsing failed: {str(e)}"
-                            response_data["raw_text"] = await response.text()
-                    else:
-                        response_data["error"] = f"HTTP {response.status}"
-                        response_data["raw_text"] = await response.text()
-                    
-                    return web.json_response(response_data)
+            return web.json_response(response_data)
                     
         except Exception as e:
             return web.json_response({
                 "error": f"Debug request failed: {str(e)}"
             }, status=500)
 
+class STKMetricsView(HomeAssistantView):
+    """Expose the fetch pipeline metrics in the Prometheus text format.
+
+    Registered only with `prometheus: true` in configuration.yaml; scrapes
+    authenticate with a long-lived access token like any other API call.
+    """
+
+    url = "/api/stk_czechr/metrics"
+    name = "api:stk_czechr:metrics"
+
+    async def get(self, request):
+        """Return the current metrics."""
+        hass = request.app[KEY_HASS]
+        body = render_prometheus(
+            async_get_metrics(hass),
+            hass.data[DOMAIN].get(DATA_RATE_LIMITERS, {}).values(),
+            async_get_single_flight(hass),
+            async_get_vehicle_coordinators(hass),
+        )
+        return web.Response(text=body, content_type="text/plain", charset="utf-8")
+
 async def async_setup(hass: HomeAssistant, config: dict):
     """Set up the STK czechr component."""
+    cache = STKczechrCache(hass)
+    await cache.async_load()
+    hass.data.setdefault(DOMAIN, {})[DATA_CACHE] = cache
+
+    # The history is optional: without its database the vehicles still work
+    history = None
+    try:
+        history = STKHistory(
+            hass,
+            await hass.async_add_executor_job(HistoryDatabase, hass.config.path(HISTORY_DATABASE)),
+        )
+    except sqlite3.Error as err:
+        _LOGGER.error(
+            "Cannot open %s, change history is disabled: %s", HISTORY_DATABASE, err
+        )
+    else:
+        hass.data[DOMAIN][DATA_HISTORY] = history
+
+    # Offline VIN index, present once a registry export has been imported
+    registry = STKRegistry(
+        hass,
+        await hass.async_add_executor_job(RegistryDatabase, hass.config.path(REGISTRY_DATABASE)),
+    )
+    hass.data[DOMAIN][DATA_REGISTRY] = registry
+
+    async def _async_close_databases(_event):
+        if history is not None:
+            await history.async_close()
+        await registry.async_close()
+
+    hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, _async_close_databases)
+
+    @callback
+    def _async_day_changed(now):
+        """Recompute days_remaining and status of all vehicles without any API call."""
+        async_dispatcher_send(hass, SIGNAL_DAY_CHANGED)
+
+    async_track_time_change(hass, _async_day_changed, hour=0, minute=0, second=0)
+
+    key_pool = async_get_key_pool(hass)
+    for api_key in config.get(DOMAIN, {}).get(CONF_API_KEYS, []):
+        key_pool.async_add_key(api_key, permanent=True)
+    key_pool.async_add_listener(lambda: async_rebalance_fleets(hass))
+
+    async_setup_services(hass)
+
+    # Fleet-wide aggregate sensors, independent of any config entry
+    hass.async_create_task(async_load_platform(hass, "sensor", DOMAIN, {}, config))
+
+    # Register HTTP endpoint for API debugging once per Home Assistant run
+    hass.http.register_view(STKApiDebugView())
+    if config.get(DOMAIN, {}).get(CONF_PROMETHEUS):
+        hass.http.register_view(STKMetricsView())
     return True
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up STK czechr from a config entry."""
     hass.data.setdefault(DOMAIN, {})
-    hass.data[DOMAIN][entry.entry_id] = entry.data
+    _async_migrate_unique_id(hass, entry)
+    async_acquire_api_session(hass)
 
-    await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+    # The entry's key joins the pool; the VIN is served by the key it hashes to
+    key_pool = async_get_key_pool(hass)
+    key_pool.async_add_key(_entry_api_key(entry))
+    api_key = key_pool.key_for(entry.data[CONF_VIN])
+    coordinator = STKczechrDataUpdateCoordinator(
+        hass, entry.data[CONF_NAME], entry.data[CONF_VIN], api_key
+    )
+    # Entities start from the persisted data, or from the offline registry
+    # index when its export is newer; the API is polled in the background
+    coordinator.async_restore()
+    await coordinator.async_restore_registry()
 
-    # Register HTTP endpoint for API debugging
-    hass.http.register_view(STKApiDebugView())
+    hass.data[DOMAIN][entry.entry_id] = coordinator
+    async_get_fleet_coordinator(hass, api_key).async_add_vehicle(
+        coordinator, coordinator.next_refresh_delay()
+    )
+
+    # Warning / expiry events fire on timers, not on API polls
+    expiry_tracker = STKExpiryTracker(hass, coordinator, entry.entry_id)
+    expiry_tracker.async_start()
+    entry.async_on_unload(expiry_tracker.async_stop)
+
+    await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+    entry.async_on_unload(entry.add_update_listener(async_reload_entry))
 
     return True
 
@@ -91,6 +276,45 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
     unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
     if unload_ok:
-        hass.data[DOMAIN].pop(entry.entry_id)
+        coordinator = hass.data[DOMAIN].pop(entry.entry_id)
+        async_remove_fleet_vehicle(hass, coordinator)
+        async_get_key_pool(hass).async_remove_key(_entry_api_key(entry))
+        await async_release_api_session(hass)
 
     return unload_ok
+
+@callback
+def _async_migrate_unique_id(hass: HomeAssistant, entry: ConfigEntry):
+    """Give an entry created before VINs were unique IDs its normalized VIN.
+
+    Without a unique ID the config flow's duplicate check misses the entry.
+    Of a vehicle added twice back then, only the first entry gets one.
+    """
+    if entry.unique_id is not None:
+        return
+    vin = normalize_vin(entry.data[CONF_VIN])
+    changes = {"data": {**entry.data, CONF_VIN: vin}}
+    if hass.config_entries.async_entry_for_domain_unique_id(DOMAIN, vin) is None:
+        changes["unique_id"] = vin
+    hass.config_entries.async_update_entry(entry, **changes)
+
+def _entry_api_key(entry: ConfigEntry):
+    """Return the API key configured for an entry."""
+    return entry.options.get(CONF_API_KEY) or entry.data.get(CONF_API_KEY, "")
+
+async def async_reload_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Reload the entry when its options change."""
+    await hass.config_entries.async_reload(entry.entry_id)
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Drop the cached data of a removed vehicle."""
+    vin = entry.data[CONF_VIN]
+    # Another entry may track the same VIN and still restore from the cache
+    if any(
+        other.entry_id != entry.entry_id and other.data.get(CONF_VIN) == vin
+        for other in hass.config_entries.async_entries(DOMAIN)
+    ):
+        return
+    cache = async_get_cache(hass)
+    if cache is not None:
+        cache.async_remove(vin)
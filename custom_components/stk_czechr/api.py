@@ -0,0 +1,256 @@
+"""HTTP session and retry policy for the dataovozidlech.cz API."""
+import asyncio
+from collections.abc import Mapping
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from datetime import timedelta
+from email.utils import parsedate_to_datetime
+import hashlib
+import logging
+import random
+import time
+import async_timeout
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.aiohttp_client import async_create_clientsession
+from homeassistant.util import dt as dt_util
+
+try:
+    # orjson based decoder shipped with Home Assistant
+    from homeassistant.util.json import json_loads
+except ImportError:
+    from json import loads as json_loads
+
+from .const import (
+    DOMAIN,
+    DATA_SESSION,
+    DATA_SINGLE_FLIGHT,
+    API_BASE_URL,
+    API_CONNECTION_LIMIT,
+    API_TIMEOUT,
+    USER_AGENT,
+    RETRY_BASE_DELAY,
+    RETRY_MAX_DELAY,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class STKApiSession:
+    """Keep-alive session to api.dataovozidlech.cz with a connection limit.
+
+    The underlying session is created through Home Assistant's aiohttp helper,
+    so it reuses the shared connector, SSL context and keep-alive pool. It is
+    excluded from Home Assistant's automatic cleanup and detached from the
+    connector when the last config entry releases it.
+    """
+
+    def __init__(self, hass: HomeAssistant):
+        """Initialize the session."""
+        self._session = async_create_clientsession(hass, auto_cleanup=False)
+        self._semaphore = asyncio.Semaphore(API_CONNECTION_LIMIT)
+        self.refs = 0
+
+    @asynccontextmanager
+    async def get(self, url, **kwargs):
+        """Perform a GET request, holding one of the limited connection slots."""
+        async with self._semaphore:
+            async with self._session.get(url, **kwargs) as response:
+                yield response
+
+    async def async_close(self):
+        """Detach the session; the connector stays shared with Home Assistant."""
+        self._session.detach()
+
+
+@callback
+def async_acquire_api_session(hass: HomeAssistant):
+    """Return the shared session, creating it for the first config entry."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    if DATA_SESSION not in domain_data:
+        domain_data[DATA_SESSION] = STKApiSession(hass)
+    api_session = domain_data[DATA_SESSION]
+    api_session.refs += 1
+    return api_session
+
+
+@callback
+def async_get_api_session(hass: HomeAssistant):
+    """Return the shared session, or None when no config entry is loaded."""
+    return hass.data.get(DOMAIN, {}).get(DATA_SESSION)
+
+
+async def async_release_api_session(hass: HomeAssistant):
+    """Release the shared session and detach it after the last config entry."""
+    api_session = async_get_api_session(hass)
+    if api_session is None:
+        return
+    api_session.refs -= 1
+    if api_session.refs <= 0:
+        hass.data[DOMAIN].pop(DATA_SESSION)
+        _LOGGER.debug("Closing shared STK API session")
+        await api_session.async_close()
+
+
+@dataclass(frozen=True, slots=True)
+class ApiResponse:
+    """Raw API response; the body is read exactly once."""
+
+    status: int
+    headers: Mapping[str, str]
+    url: str
+    text: str
+
+
+async def async_request_vehicle(session, vin, api_key, metrics=None):
+    """GET the technical data of a VIN and return the raw response.
+
+    When `metrics` is given, the call's status and latency are recorded in it.
+    """
+    # API call according to official documentation
+    headers = {
+        "API_KEY": api_key,  # Correct header name
+        "Content-Type": "application/json",
+        "User-Agent": USER_AGENT,
+    }
+    _LOGGER.debug("Calling API: %s?vin=%s", API_BASE_URL, vin)
+    started = time.monotonic()
+    status = "error"
+    try:
+        async with async_timeout.timeout(API_TIMEOUT):
+            async with session.get(API_BASE_URL, params={"vin": vin}, headers=headers) as response:
+                _LOGGER.debug("API response status: %s", response.status)
+                result = ApiResponse(
+                    response.status, response.headers, str(response.url), await response.text()
+                )
+                status = response.status
+                return result
+    except TimeoutError:
+        status = "timeout"
+        raise
+    finally:
+        if metrics is not None:
+            metrics.record_request(status, time.monotonic() - started)
+
+
+def hash_payload(text):
+    """Return a content hash of a raw response body."""
+    return hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+
+
+def parse_retry_after(value):
+    """Return the Retry-After header (seconds or HTTP date) in seconds, or None."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        # "-0000" marks a UTC time without a known local zone (RFC 5322)
+        retry_at = retry_at.replace(tzinfo=dt_util.UTC)
+    return max(0.0, (retry_at - dt_util.utcnow()).total_seconds())
+
+
+class RetryState:
+    """Retry bookkeeping of one VIN.
+
+    Failed fetches are not retried inline; the VIN is pushed back in the
+    fleet schedule by the delay returned from record_failure(): the server's
+    Retry-After when given, otherwise exponential backoff with jitter.
+    """
+
+    def __init__(self):
+        """Initialize."""
+        self.attempts = 0
+        self.delay = None
+        self.last_error = None
+        self.last_status = None
+        self.next_retry = None
+
+    @property
+    def pending(self):
+        """Return True while the VIN is backing off after a failure."""
+        return self.attempts > 0
+
+    def record_failure(self, error, status=None, retry_after=None):
+        """Record a failed fetch and return the delay before the next attempt."""
+        self.attempts += 1
+        self.last_error = error
+        self.last_status = status
+        if retry_after is not None:
+            delay = retry_after
+        else:
+            backoff = min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** (self.attempts - 1))
+            # "Equal jitter": keep half of the backoff, randomize the other half
+            delay = backoff / 2 + random.uniform(0, backoff / 2)
+        self.delay = delay
+        self.next_retry = dt_util.utcnow() + timedelta(seconds=delay)
+        return delay
+
+    def reset(self):
+        """Forget failures after a successful fetch."""
+        self.attempts = 0
+        self.delay = None
+        self.last_error = None
+        self.last_status = None
+        self.next_retry = None
+
+    def as_dict(self):
+        """Return the retry state for diagnostics."""
+        return {
+            "attempts": self.attempts,
+            "delay": round(self.delay, 1) if self.delay is not None else None,
+            "last_error": self.last_error,
+            "last_status": self.last_status,
+            "next_retry": self.next_retry.isoformat() if self.next_retry else None,
+        }
+
+
+class SingleFlight:
+    """Coalesce concurrent fetches of the same VIN into one API call.
+
+    Fetches are keyed by (VIN, API key), so a caller never receives the
+    response to a request made with another key.
+
+    The first caller starts the fetch; callers arriving while it is in flight
+    await the same task instead of spending another quota token. The task is
+    shielded, so a cancelled caller does not cancel it for the others.
+    """
+
+    def __init__(self):
+        """Initialize."""
+        self._in_flight = {}
+        self.started = 0
+        self.coalesced = 0
+
+    async def async_run(self, key, fetch):
+        """Return the result of fetch(), shared with concurrent callers of `key`."""
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fetch())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+            self.started += 1
+        else:
+            self.coalesced += 1
+            _LOGGER.debug("Joining in-flight request for VIN %s", key[0])
+        return await asyncio.shield(task)
+
+    @property
+    def in_flight(self):
+        """Return the number of requests currently in flight."""
+        return len(self._in_flight)
+
+
+@callback
+def async_get_single_flight(hass: HomeAssistant):
+    """Return the integration-wide in-flight request map."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    if DATA_SINGLE_FLIGHT not in domain_data:
+        domain_data[DATA_SINGLE_FLIGHT] = SingleFlight()
+    return domain_data[DATA_SINGLE_FLIGHT]
@@ -0,0 +1,64 @@
+"""Persistent cache of processed vehicle data."""
+import logging
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util
+
+from .const import DOMAIN, DATA_CACHE, STORAGE_KEY, STORAGE_VERSION, STORAGE_SAVE_DELAY
+from .models import VehicleRecord
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class STKczechrCache:
+    """Processed payload and fetch time per VIN, kept across restarts."""
+
+    def __init__(self, hass: HomeAssistant):
+        """Initialize the cache."""
+        self._store = Store(hass, STORAGE_VERSION, STORAGE_KEY)
+        self._vehicles = {}
+
+    async def async_load(self):
+        """Load cached vehicles from disk."""
+        stored = await self._store.async_load()
+        if stored:
+            self._vehicles = stored.get("vehicles", {})
+        _LOGGER.debug("Loaded cached data for %s vehicles", len(self._vehicles))
+
+    def get(self, vin):
+        """Return (VehicleRecord, fetched_at, payload hash) for a VIN, or None."""
+        entry = self._vehicles.get(vin)
+        if not entry:
+            return None
+        fetched_at = dt_util.parse_datetime(entry["fetched_at"])
+        if fetched_at is None:
+            return None
+        return VehicleRecord.from_dict(entry["data"]), fetched_at, entry.get("hash")
+
+    @callback
+    def async_set(self, vin, record, fetched_at, payload_hash=None):
+        """Store the record of a VIN and schedule a write."""
+        self._vehicles[vin] = {
+            "data": record.as_dict(),
+            "fetched_at": fetched_at.isoformat(),
+            "hash": payload_hash,
+        }
+        self._store.async_delay_save(self._data_to_save, STORAGE_SAVE_DELAY)
+
+    @callback
+    def async_remove(self, vin):
+        """Forget a VIN and schedule a write."""
+        if self._vehicles.pop(vin, None) is not None:
+            self._store.async_delay_save(self._data_to_save, STORAGE_SAVE_DELAY)
+
+    @callback
+    def _data_to_save(self):
+        """Return the data to write to disk."""
+        return {"vehicles": self._vehicles}
+
+
+@callback
+def async_get_cache(hass: HomeAssistant):
+    """Return the cache, or None when the integration has not been set up."""
+    return hass.data.get(DOMAIN, {}).get(DATA_CACHE)
@@ -2,15 +2,20 @@
 import voluptuous as vol
 from homeassistant import config_entries
 from homeassistant.core import callback
+import homeassistant.helpers.config_validation as cv
 from .const import (
     DOMAIN, 
     CONF_NAME, 
     CONF_VIN, 
     CONF_API_KEY,
+    CONF_SENSOR_GROUPS,
+    CONF_VEHICLE_INFO,
+    DEFAULT_SENSOR_GROUPS,
+    SENSOR_GROUPS,
     ERROR_INVALID_VIN, 
-    ERROR_VIN_EXISTS,
     ERROR_API_KEY_MISSING
 )
+from .util import normalize_vin, validate_vin
 
 class STKczechrConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     """Handle a config flow for STK czechr."""
@@ -23,20 +28,21 @@ class STKczechrConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         errors = {}
 
         if user_input is not None:
-            # Check if VIN already exists
-            existing_entries = [entry.data[CONF_VIN] for entry in self._async_current_entries()]
-            if user_input[CONF_VIN] in existing_entries:
-                errors["base"] = ERROR_VIN_EXISTS
             # Validate VIN
-            elif not self._validate_vin(user_input[CONF_VIN]):
+            if not self._validate_vin(user_input[CONF_VIN]):
                 errors["base"] = ERROR_INVALID_VIN
             # Validate API key
             elif not user_input.get(CONF_API_KEY):
                 errors["base"] = ERROR_API_KEY_MISSING
             else:
+                # Unique IDs are indexed by Home Assistant, so an existing
+                # VIN is found without scanning the configured entries
+                vin = normalize_vin(user_input[CONF_VIN])
+                await self.async_set_unique_id(vin)
+                self._abort_if_unique_id_configured()
                 return self.async_create_entry(
                     title=user_input[CONF_NAME],
-                    data=user_input
+                    data={**user_input, CONF_VIN: vin}
                 )
 
         return self.async_show_form(
@@ -49,12 +55,17 @@ class STKczechrConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             errors=errors,
         )
 
+    async def async_step_import(self, import_data):
+        """Create an entry for a vehicle validated by the bulk import service."""
+        # Unique IDs are indexed by Home Assistant, so this is an O(1) check
+        await self.async_set_unique_id(import_data[CONF_VIN])
+        self._abort_if_unique_id_configured()
+        return self.async_create_entry(title=import_data[CONF_NAME], data=import_data)
+
     @staticmethod
     def _validate_vin(vin):
         """Validate the VIN."""
-        if len(vin) != 17:
-            return False
-        return vin.isalnum()
+        return validate_vin(normalize_vin(vin))
 
     @staticmethod
     @callback
@@ -79,7 +90,17 @@ class STKczechrOptionsFlow(config_entries.OptionsFlow):
             data_schema=vol.Schema({
                 vol.Optional(
                     CONF_API_KEY,
-                    default=self.config_entry.data.get(CONF_API_KEY, "")
+                    default=self.config_entry.options.get(
+                        CONF_API_KEY, self.config_entry.data.get(CONF_API_KEY, "")
+                    )
                 ): str,
+                vol.Optional(
+                    CONF_SENSOR_GROUPS,
+                    default=self.config_entry.options.get(CONF_SENSOR_GROUPS, DEFAULT_SENSOR_GROUPS)
+                ): cv.multi_select(SENSOR_GROUPS),
+                vol.Optional(
+                    CONF_VEHICLE_INFO,
+                    default=self.config_entry.options.get(CONF_VEHICLE_INFO, False)
+                ): bool,
             })
         )
@@ -1,3 +1,5 @@
+import os
+
 # Custom component domain
 DOMAIN = "stk_czechr"
 
@@ -6,6 +8,26 @@ CONF_NAME = "name"
 CONF_VIN = "vin"
 CONF_API_KEY = "api_key"
 
+# Services
+SERVICE_IMPORT_VEHICLES = "import_vehicles"
+ATTR_CSV = "csv"
+ATTR_PATH = "path"
+ATTR_VEHICLES = "vehicles"
+ATTR_STRICT_CHECK_DIGIT = "strict_check_digit"
+SERVICE_QUERY_HISTORY = "query_history"
+ATTR_FIELD = "field"
+ATTR_SINCE = "since"
+ATTR_UNTIL = "until"
+ATTR_VALID_FROM = "valid_from"
+ATTR_VALID_TO = "valid_to"
+ATTR_RENEWALS = "renewals"
+ATTR_LIMIT = "limit"
+SERVICE_REFRESH = "refresh"
+ATTR_VINS = "vins"
+SERVICE_IMPORT_REGISTRY = "import_registry"
+ATTR_EXPORTED_AT = "exported_at"
+ATTR_ENCODING = "encoding"
+
 # Platform names
 PLATFORM_SENSOR = "sensor"
 
@@ -21,11 +43,108 @@ ERROR_API_KEY_MISSING = "API key is required for dataovozidlech.cz"
 DEFAULT_UPDATE_INTERVAL = 60  # 1 minute
 API_TIMEOUT = 30  # seconds
 
+# Adaptive refresh policy: poll more often as the STK expiry approaches.
+# (minimum days remaining, refresh interval in seconds), checked in order.
+REFRESH_INTERVALS = (
+    (60, 7 * 24 * 3600),  # far from expiry - weekly
+    (30, 24 * 3600),  # approaching the warning period - daily
+    (7, 6 * 3600),  # warning period - every 6 hours
+    (0, 3600),  # last week before expiry - hourly
+)
+REFRESH_INTERVAL_EXPIRED = 3600  # renewal expected - hourly
+REFRESH_INTERVAL_EXPIRED_LONG = 24 * 3600  # expired for a long time - daily
+REFRESH_EXPIRED_LONG_DAYS = 30
+REFRESH_INTERVAL_NO_EXPIRY = 7 * 24 * 3600  # vehicle without an STK date
+
+# Repeats of the same failure of a VIN are logged at most once per interval
+LOG_THROTTLE_INTERVAL = 3600  # seconds
+
+HTTP_UNAUTHORIZED = 401
+HTTP_TOO_MANY_REQUESTS = 429
+
+# Backoff after failed requests (Retry-After from the server takes precedence)
+RETRY_BASE_DELAY = 60  # seconds, doubled after every consecutive failure
+RETRY_MAX_DELAY = 6 * 3600  # seconds
+
+# API quota shared by all vehicles using the same API key (27 calls per minute)
+API_RATE_LIMIT = 27
+API_RATE_PERIOD = 60  # seconds
+# Tokens the limiter may bank; a larger burst lets a sliding 60 s window see
+# up to API_RATE_LIMIT + burst requests and triggers 429s
+API_RATE_BURST = 1
+
+# Maximum number of concurrent connections to the API across all vehicles
+API_CONNECTION_LIMIT = 4
+
+# Keys in hass.data[DOMAIN] shared across config entries
+DATA_RATE_LIMITERS = "rate_limiters"
+DATA_SESSION = "session"
+DATA_FLEETS = "fleets"
+DATA_CACHE = "cache"
+DATA_SINGLE_FLIGHT = "single_flight"
+DATA_METRICS = "metrics"
+DATA_KEY_POOL = "key_pool"
+DATA_HISTORY = "history"
+DATA_EXPIRY_INDEX = "expiry_index"
+DATA_REGISTRY = "registry"
+
+# Persistent cache of processed vehicle data
+STORAGE_KEY = "stk_czechr.cache"
+STORAGE_VERSION = 1
+STORAGE_SAVE_DELAY = 30  # seconds
+
+USER_AGENT = "HomeAssistant-STK-czechr/0.4.9"
+
+# SQLite history of changes, in the configuration directory
+HISTORY_DATABASE = "stk_czechr_history.db"
+# Record fields whose changes are kept in the history
+HISTORY_TRACKED_FIELDS = (
+    "valid_until",
+    "owners_count",
+    "operators_count",
+    "status_name",
+    "orv_number",
+    "tp_number",
+)
+
+# Offline VIN index built from the open-data registry dump, in the
+# configuration directory
+REGISTRY_DATABASE = "stk_czechr_registry.db"
+# Bytes of the dump normalized per worker task
+REGISTRY_CHUNK_SIZE = 16 * 2**20
+# Worker processes normalizing the dump; leave a core to Home Assistant
+REGISTRY_WORKERS = min(4, max(1, (os.cpu_count() or 1) - 1))
+
+# configuration.yaml: expose /api/stk_czechr/metrics in Prometheus format
+CONF_PROMETHEUS = "prometheus"
+# configuration.yaml: additional API keys the vehicles are sharded across
+CONF_API_KEYS = "api_keys"
+# Points per API key on the consistent-hash ring
+KEY_POOL_VIRTUAL_NODES = 64
+
 # API endpoints
 API_BASE_URL = "https://api.dataovozidlech.cz/api/vehicletechnicaldata/v2"
 API_REGISTRATION_URL = "https://dataovozidlech.cz/registraceApi"
 API_DOCUMENTATION_URL = "https://dataovozidlech.cz/data/RSV_Verejna_API_DK_v1_0.pdf"
 
+# Options
+CONF_SENSOR_GROUPS = "sensor_groups"
+CONF_VEHICLE_INFO = "vehicle_info"
+
+# Sensor groups selectable in the options flow
+SENSOR_GROUPS = {
+    "stk": "STK",
+    "identification": "Identifikace vozidla",
+    "physical": "Fyzické vlastnosti",
+    "dimensions": "Rozměry",
+    "performance": "Výkon",
+    "documents": "Doklady",
+    "registration": "Registrace",
+    "details": "Další údaje o vozidle",
+    "consumption": "Spotřeba a emise",
+    "noise_status": "Hluk a stav",
+}
+
 # Sensor types with their translations
 SENSOR_TYPES = {
     # Core STK sensors - enabled by default
@@ -33,6 +152,7 @@ SENSOR_TYPES = {
         "name": "Platnost STK",
         "icon": "mdi:calendar-clock",
         "device_class": "date",
+        "group": "stk",
         "enabled_by_default": True,
     },
     "days_remaining": {
@@ -40,11 +160,13 @@ SENSOR_TYPES = {
         "icon": "mdi:timer-sand",
         "device_class": "duration",
         "unit_of_measurement": "days",
+        "group": "stk",
         "enabled_by_default": True,
     },
     "status": {
         "name": "Stav STK",
         "icon": "mdi:car-wrench",
+        "group": "stk",
         "enabled_by_default": True,
     },
     
@@ -52,16 +174,19 @@ SENSOR_TYPES = {
     "brand": {
         "name": "Značka",
         "icon": "mdi:car",
+        "group": "identification",
         "enabled_by_default": True,
     },
     "model": {
         "name": "Model",
         "icon": "mdi:car-side",
+        "group": "identification",
         "enabled_by_default": True,
     },
     "vin": {
         "name": "VIN",
         "icon": "mdi:identifier",
+        "group": "identification",
         "enabled_by_default": True,
     },
     
@@ -69,12 +194,14 @@ SENSOR_TYPES = {
     "color": {
         "name": "Barva",
         "icon": "mdi:palette",
+        "group": "physical",
         "enabled_by_default": True,
     },
     "weight": {
         "name": "Provozní hmotnost",
         "icon": "mdi:weight",
         "unit_of_measurement": "kg",
+        "group": "physical",
         "enabled_by_default": True,
     },
     
@@ -83,18 +210,21 @@ SENSOR_TYPES = {
         "name": "Délka",
         "icon": "mdi:arrow-expand-horizontal",
         "unit_of_measurement": "mm",
+        "group": "dimensions",
         "enabled_by_default": True,
     },
     "width": {
         "name": "Šířka",
         "icon": "mdi:arrow-expand-horizontal",
         "unit_of_measurement": "mm",
+        "group": "dimensions",
         "enabled_by_default": True,
     },
     "height": {
         "name": "Výška",
         "icon": "mdi:arrow-expand-vertical",
         "unit_of_measurement": "mm",
+        "group": "dimensions",
         "enabled_by_default": True,
     },
     
@@ -103,6 +233,7 @@ SENSOR_TYPES = {
         "name": "Maximální rychlost",
         "icon": "mdi:speedometer",
         "unit_of_measurement": "km/h",
+        "group": "performance",
         "enabled_by_default": True,
     },
     "engine_power": {
@@ -110,17 +241,20 @@ SENSOR_TYPES = {
         "icon": "mdi:engine",
         "unit_of_measurement": "kW",
         "device_class": "power",
+        "group": "performance",
         "enabled_by_default": True,
     },
     "engine_displacement": {
         "name": "Objem motoru",
         "icon": "mdi:engine",
         "unit_of_measurement": "cm³",
+        "group": "performance",
         "enabled_by_default": True,
     },
     "fuel_type": {
         "name": "Palivo",
         "icon": "mdi:gas-station",
+        "group": "performance",
         "enabled_by_default": True,
     },
     
@@ -128,11 +262,13 @@ SENSOR_TYPES = {
     "tp_number": {
         "name": "Číslo TP",
         "icon": "mdi:card-account-details",
+        "group": "documents",
         "enabled_by_default": False,
     },
     "orv_number": {
         "name": "Číslo ORV",
         "icon": "mdi:card-account-details",
+        "group": "documents",
         "enabled_by_default": False,
     },
     
@@ -141,12 +277,14 @@ SENSOR_TYPES = {
         "name": "Datum první registrace",
         "icon": "mdi:calendar",
         "device_class": "date",
+        "group": "registration",
         "enabled_by_default": False,
     },
     "first_registration_cz": {
         "name": "Datum první registrace v ČR",
         "icon": "mdi:calendar-check",
         "device_class": "date",
+        "group": "registration",
         "enabled_by_default": False,
     },
     
@@ -154,23 +292,27 @@ SENSOR_TYPES = {
     "category": {
         "name": "Kategorie",
         "icon": "mdi:car-info",
+        "group": "details",
         "enabled_by_default": False,
     },
     "vehicle_type": {
         "name": "Typ vozidla",
         "icon": "mdi:motorbike",
+        "group": "details",
         "enabled_by_default": False,
     },
     "max_weight": {
         "name": "Nejvyšší povolená hmotnost",
         "icon": "mdi:weight",
         "unit_of_measurement": "kg",
+        "group": "details",
         "enabled_by_default": False,
     },
     "wheelbase": {
         "name": "Rozvor",
         "icon": "mdi:arrow-expand-horizontal",
         "unit_of_measurement": "mm",
+        "group": "details",
         "enabled_by_default": False,
     },
     
@@ -180,6 +322,7 @@ SENSOR_TYPES = {
         "icon": "mdi:fuel",
         "unit_of_measurement": "l/100km",
         "device_class": "gas",
+        "group": "consumption",
         "enabled_by_default": False,
     },
     "consumption_highway": {
@@ -187,6 +330,7 @@ SENSOR_TYPES = {
         "icon": "mdi:fuel",
         "unit_of_measurement": "l/100km",
         "device_class": "gas",
+        "group": "consumption",
         "enabled_by_default": False,
     },
     "consumption_combined": {
@@ -194,12 +338,14 @@ SENSOR_TYPES = {
         "icon": "mdi:fuel",
         "unit_of_measurement": "l/100km",
         "device_class": "gas",
+        "group": "consumption",
         "enabled_by_default": False,
     },
     "co2_emissions": {
         "name": "Emise CO2",
         "icon": "mdi:molecule-co2",
         "unit_of_measurement": "g/km",
+        "group": "consumption",
         "enabled_by_default": False,
     },
     
@@ -208,33 +354,85 @@ SENSOR_TYPES = {
         "name": "Hluk - stojící",
         "icon": "mdi:volume-high",
         "unit_of_measurement": "dB",
+        "group": "noise_status",
         "enabled_by_default": False,
     },
     "noise_driving": {
         "name": "Hluk - jízda",
         "icon": "mdi:volume-high",
         "unit_of_measurement": "dB",
+        "group": "noise_status",
         "enabled_by_default": False,
     },
     "status_name": {
         "name": "Stav vozidla",
         "icon": "mdi:car-info",
+        "group": "noise_status",
         "enabled_by_default": False,
     },
     "owners_count": {
         "name": "Počet vlastníků",
         "icon": "mdi:account-multiple",
+        "group": "noise_status",
         "enabled_by_default": False,
     },
     "operators_count": {
         "name": "Počet provozovatelů",
         "icon": "mdi:account-multiple",
+        "group": "noise_status",
         "enabled_by_default": False,
     },
 }
 
+# Days before expiry from which the STK status is "warning"
+STATUS_WARNING_DAYS = 30
+
+# Dispatcher signal sent at local midnight to refresh date-derived sensors
+SIGNAL_DAY_CHANGED = f"{DOMAIN}_day_changed"
+
+# Dispatcher signal sent when the fleet expiry index changed
+SIGNAL_FLEET_UPDATED = f"{DOMAIN}_fleet_updated"
+# Vehicles listed by the "next to expire" fleet sensor
+FLEET_UPCOMING_COUNT = 10
+
+# Bus events fired at the exact moment a vehicle's STK status changes
+EVENT_STK_WARNING = f"{DOMAIN}_warning"
+EVENT_STK_EXPIRED = f"{DOMAIN}_expired"
+EVENT_STK_RENEWED = f"{DOMAIN}_renewed"
+
+# Groups created when no selection was made in the options flow
+DEFAULT_SENSOR_GROUPS = [
+    group
+    for group in SENSOR_GROUPS
+    if any(
+        info["group"] == group and info["enabled_by_default"]
+        for info in SENSOR_TYPES.values()
+    )
+]
+
+# Summary entity with the fields of unselected groups as attributes
+VEHICLE_INFO_SENSOR = {
+    "name": "Informace o vozidle",
+    "icon": "mdi:car-info",
+}
+
+# Sensors derived from valid_until and the current date
+DERIVED_SENSOR_TYPES = ("days_remaining", "status")
+
 class STKStatus:
     VALID = "valid"
     EXPIRED = "expired"
     WARNING = "warning"  # Less than 30 days remaining
     UNKNOWN = "unknown"
+
+# Fleet-wide sensors computed from the expiry index
+FLEET_STATUS_SENSORS = {
+    STKStatus.EXPIRED: {"name": "STK flotila vypršelé", "icon": "mdi:car-off"},
+    STKStatus.WARNING: {"name": "STK flotila končící", "icon": "mdi:car-clock"},
+    STKStatus.VALID: {"name": "STK flotila platné", "icon": "mdi:car-check"},
+    STKStatus.UNKNOWN: {"name": "STK flotila neznámé", "icon": "mdi:car-info"},
+}
+FLEET_NEXT_EXPIRY_SENSOR = {
+    "name": "STK flotila nejbližší konec platnosti",
+    "icon": "mdi:calendar-clock",
+}
@@ -0,0 +1,637 @@
+"""Data update coordinators for STK czechr."""
+import asyncio
+import heapq
+import itertools
+import logging
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
+from homeassistant.util import dt as dt_util
+
+from .api import (
+    RetryState,
+    async_get_api_session,
+    async_get_single_flight,
+    async_request_vehicle,
+    hash_payload,
+    json_loads,
+    parse_retry_after,
+)
+from .cache import async_get_cache
+from .history import async_get_history
+from .key_pool import async_get_key_pool, mask_key
+from .registry import async_get_registry
+from .log_throttle import LogThrottle
+from .const import (
+    DOMAIN,
+    DATA_FLEETS,
+    API_REGISTRATION_URL,
+    API_DOCUMENTATION_URL,
+    API_RATE_LIMIT,
+    API_RATE_PERIOD,
+    HTTP_TOO_MANY_REQUESTS,
+    HTTP_UNAUTHORIZED,
+    DEFAULT_UPDATE_INTERVAL,
+    ERROR_API_KEY_MISSING,
+    REFRESH_INTERVALS,
+    REFRESH_INTERVAL_EXPIRED,
+    REFRESH_INTERVAL_EXPIRED_LONG,
+    REFRESH_EXPIRED_LONG_DAYS,
+    REFRESH_INTERVAL_NO_EXPIRY,
+)
+from .metrics import async_get_metrics
+from .models import VehicleRecord
+from .rate_limiter import async_get_rate_limiter
+from .parser import parse_vehicle_data
+from .util import calculate_days_remaining, days_until_expiry
+
+_LOGGER = logging.getLogger(__name__)
+# Failures are logged once per VIN (or API key) and error class per LOG_THROTTLE_INTERVAL
+_LOG_THROTTLE = LogThrottle(_LOGGER)
+
+class STKczechrDataUpdateCoordinator(DataUpdateCoordinator):
+    """Class to manage fetching data from the API."""
+
+    def __init__(self, hass, name, vin, api_key):
+        """Initialize."""
+        super().__init__(
+            hass,
+            _LOGGER,
+            name=f"{name} STK Data",
+            # Polling is driven by STKczechrFleetCoordinator, not per-VIN timers
+            update_interval=None,
+            # Listeners are only notified when the record actually changed
+            always_update=False,
+        )
+        self.name = name
+        self.vin = vin
+        self.api_key = api_key
+        self._session = async_get_api_session(hass)
+        self._rate_limiter = async_get_rate_limiter(hass, api_key)
+        self._single_flight = async_get_single_flight(hass)
+        self._cache = async_get_cache(hass)
+        self._metrics = async_get_metrics(hass)
+        self._last_request_time = None
+        self._cached_data = None  # Last successful VehicleRecord
+        self._data_time = None  # When _cached_data was current: fetch or registry export time
+        self._registry_restored_at = None  # Refreshes of registry data are scheduled from here
+        self._payload_hash = None  # Hash of the raw body behind _cached_data
+        self._priority = False  # True during a refresh requested by the user
+        self._promote = None  # Set to move a fetch waiting for a token to the priority lane
+        self.retry = RetryState()
+
+    @property
+    def last_fetch(self):
+        """Return the time of the last successful API call."""
+        return self._last_request_time
+
+    @property
+    def rate_limiter(self):
+        """Return the rate limiter shared by this vehicle's API key."""
+        return self._rate_limiter
+
+    @callback
+    def async_set_api_key(self, api_key):
+        """Switch to another key of the pool, with that key's limiter."""
+        self.api_key = api_key
+        self._rate_limiter = async_get_rate_limiter(self.hass, api_key)
+
+    @callback
+    def async_restore(self):
+        """Hydrate from the persistent cache without calling the API."""
+        if self._cache is None:
+            return False
+        cached = self._cache.get(self.vin)
+        if cached is None:
+            return False
+        self._cached_data, self._last_request_time, self._payload_hash = cached
+        self._data_time = self._last_request_time
+        _LOGGER.debug("Restored cached data for VIN %s from %s", self.vin, self._last_request_time)
+        self.async_set_updated_data(self._cached_data)
+        return True
+
+    async def async_restore_registry(self):
+        """Hydrate from the offline registry index without calling the API.
+
+        The index replaces data fetched before its export. The API is asked
+        again one refresh interval after the restore, so an old export does
+        not send every vehicle to the API at once.
+        """
+        registry = async_get_registry(self.hass)
+        if registry is None:
+            return False
+        exported_at = registry.exported_at
+        if self._data_time is not None and (exported_at is None or exported_at <= self._data_time):
+            return False
+        record = await registry.async_lookup(self.vin)
+        if record is None:
+            return False
+        self._cached_data = record
+        self._data_time = exported_at
+        self._registry_restored_at = dt_util.utcnow()
+        self._payload_hash = None
+        _LOGGER.debug("Restored VIN %s from the registry export of %s", self.vin, registry.exported_at)
+        self.async_set_updated_data(record)
+        return True
+
+    @callback
+    def async_promote(self):
+        """Move a fetch of this coordinator waiting for a token to the priority lane."""
+        if self._promote is not None:
+            self._promote.set()
+
+    async def async_priority_refresh(self):
+        """Fetch now on the priority lane of the limiter, skipping the minimum interval."""
+        self._priority = True
+        # A routine fetch of this VIN and key may be queued, started by this
+        # or another entry's coordinator; the refresh joins it through the
+        # single flight, so the queued fetch is promoted wherever it waits
+        for coordinator in async_get_vehicle_coordinators(self.hass, self.vin):
+            if coordinator.api_key == self.api_key:
+                coordinator.async_promote()
+        try:
+            await self.async_refresh()
+        finally:
+            self._priority = False
+
+    async def _async_update_data(self):
+        """Fetch data using official API with rate limiting."""
+        try:
+            # Check if we should make a request (rate limiting)
+            if not self._priority and not self._should_make_request():
+                _LOGGER.debug("Rate limit active, skipping request for VIN %s", self.vin)
+                if self._cached_data:
+                    _LOGGER.debug("Using cached data for VIN %s", self.vin)
+                    self._metrics.cache_hits += 1
+                    return self._cached_data
+                else:
+                    _LOG_THROTTLE.warning(
+                        self.vin, "no_cache", "No cached data available for VIN %s", self.vin
+                    )
+                    return {"error": "Rate limited and no cached data"}
+            
+            if not self.api_key:
+                _LOG_THROTTLE.warning(
+                    self.vin, ERROR_API_KEY_MISSING, "No API key provided for VIN %s", self.vin
+                )
+                return {
+                    "error": ERROR_API_KEY_MISSING,
+                    "api_registration_url": API_REGISTRATION_URL,
+                    "api_documentation_url": API_DOCUMENTATION_URL,
+                    "message": "Please register for API access at dataovozidlech.cz"
+                }
+            
+            # Make API call
+            new_data = await self._call_api()
+            
+            # Only update cache and timestamp if API call was successful
+            if isinstance(new_data, VehicleRecord):
+                self.retry.reset()
+                if _LOG_THROTTLE.reset(self.vin):
+                    _LOGGER.info("API calls for VIN %s succeed again", self.vin)
+                # Check if data has actually changed
+                if self._has_data_changed(new_data):
+                    _LOGGER.info("Data changed for VIN %s, updating cache", self.vin)
+                    previous = self._cached_data
+                    self._cached_data = new_data
+                    self._last_request_time = dt_util.utcnow()
+                    history = async_get_history(self.hass)
+                    if history is not None:
+                        self.hass.async_create_task(
+                            history.async_record(
+                                self.vin, previous, new_data, self._last_request_time
+                            )
+                        )
+                else:
+                    _LOGGER.debug("No data changes for VIN %s, keeping existing cache", self.vin)
+                    # Still update timestamp to respect rate limiting
+                    self._last_request_time = dt_util.utcnow()
+                self._data_time = self._last_request_time
+                if self._cache is not None:
+                    self._cache.async_set(
+                        self.vin, self._cached_data, self._last_request_time, self._payload_hash
+                    )
+            else:
+                self._record_failure(new_data)
+                _LOG_THROTTLE.warning(
+                    self.vin, new_data.get("status") or new_data["error"],
+                    "API call failed for VIN %s (%s), keeping cached data, retrying in %.0f s",
+                    self.vin, new_data["error"], self.retry.delay,
+                )
+                # Return cached data if available, otherwise return error
+                if self._cached_data:
+                    return self._cached_data
+                else:
+                    return new_data
+            
+            return self._cached_data or new_data
+            
+        except Exception as err:
+            _LOG_THROTTLE.error(
+                self.vin, type(err).__name__, "Error fetching data for VIN %s: %s", self.vin, err
+            )
+            self.retry.record_failure(str(err))
+            self._metrics.record_retry("error")
+            # Return cached data if available, otherwise return error
+            if self._cached_data:
+                _LOGGER.debug("Returning cached data due to error for VIN %s", self.vin)
+                return self._cached_data
+            else:
+                return {"error": str(err)}
+
+    async def _async_fetch(self):
+        """Wait for a rate limit token and call the API."""
+        # Wait for a token from the limiter shared by all VINs of this API key
+        self._promote = asyncio.Event()
+        try:
+            await self._rate_limiter.acquire(priority=self._priority, promoted=self._promote)
+        finally:
+            self._promote = None
+
+        _LOGGER.debug("Fetching data via official API for VIN %s", self.vin)
+        return await async_request_vehicle(self._session, self.vin, self.api_key, self._metrics)
+
+    async def _call_api(self):
+        """Call the official API."""
+        try:
+            # Concurrent refreshes of the same VIN (scheduled tick, manual
+            # refresh, debug view, another entry with the same VIN) share
+            # one API call
+            response = await self._single_flight.async_run(
+                (self.vin, self.api_key), self._async_fetch
+            )
+            
+            if response.status == 200:
+                payload_hash = hash_payload(response.text)
+                if self._cached_data and payload_hash == self._payload_hash:
+                    # Same payload as last time - skip decoding and processing
+                    _LOGGER.debug("Payload unchanged for VIN %s", self.vin)
+                    self._metrics.cache_hits += 1
+                    return self._cached_data
+                self._metrics.cache_misses += 1
+                data = json_loads(response.text)
+                if _LOGGER.isEnabledFor(logging.DEBUG):
+                    _LOGGER.debug("API response data: %s", data)
+                record = self._process_api_data(data)
+                if isinstance(record, VehicleRecord):
+                    self._payload_hash = payload_hash
+                return record
+            elif response.status == HTTP_UNAUTHORIZED:
+                return {"error": "Invalid API key", "status": response.status}
+            elif response.status == 404:
+                return {"error": "Vehicle not found", "status": response.status}
+            elif response.status == HTTP_TOO_MANY_REQUESTS:
+                return {
+                    "error": "Rate limited - too many requests",
+                    "status": response.status,
+                    "retry_after": parse_retry_after(response.headers.get("Retry-After")),
+                }
+            else:
+                # The body goes to the debug log only; the failure itself is
+                # logged (throttled) by _async_update_data
+                if _LOGGER.isEnabledFor(logging.DEBUG):
+                    _LOGGER.debug("API error %s: %s", response.status, response.text)
+                return {
+                    "error": f"API request failed: {response.status}",
+                    "status": response.status,
+                    "retry_after": parse_retry_after(response.headers.get("Retry-After")),
+                }
+                    
+        except TimeoutError:
+            return {"error": "API request timed out"}
+        except Exception as e:
+            _LOGGER.debug("API call for VIN %s failed", self.vin, exc_info=True)
+            return {"error": f"API call failed: {str(e)}"}
+
+    def _process_api_data(self, data):
+        """Process API response data."""
+        try:
+            # Check if data is empty or has error
+            if not data or not isinstance(data, dict):
+                return {"error": "No data received from API"}
+            
+            # Extract vehicle data from API response
+            # The API returns data in a specific structure with Status and Data fields
+            if "Status" in data and data["Status"] == 1 and "Data" in data:
+                vehicle_data = data["Data"]
+            else:
+                return {"error": "Invalid API response format"}
+            
+            # Every raw field is parsed once into all record fields derived from it
+            record = parse_vehicle_data(vehicle_data)
+            if _LOGGER.isEnabledFor(logging.DEBUG):
+                _LOGGER.debug("Processed data: %s", record)
+            return record
+            
+        except Exception as err:
+            _LOG_THROTTLE.error(
+                self.vin, "processing", "Error processing API data of VIN %s: %s", self.vin, err
+            )
+            return {"error": "Data processing error"}
+
+    def _should_make_request(self):
+        """Check if we should make a request based on rate limiting."""
+        if self._last_request_time is None:
+            return True
+        
+        time_since_last = dt_util.utcnow() - self._last_request_time
+        # Ensure at least 1 minute between requests
+        return time_since_last.total_seconds() >= DEFAULT_UPDATE_INTERVAL
+
+    def _record_failure(self, error_data):
+        """Back off after a failed API call; a 429 also pauses the shared limiter."""
+        retry_after = error_data.get("retry_after")
+        self.retry.record_failure(error_data["error"], error_data.get("status"), retry_after)
+        self._metrics.record_retry(error_data.get("status") or "error")
+        if error_data.get("status") == HTTP_TOO_MANY_REQUESTS:
+            pause = retry_after if retry_after is not None else API_RATE_PERIOD
+            self._rate_limiter.pause(pause)
+            # Every vehicle of the key runs into the same exhausted quota
+            _LOG_THROTTLE.log(
+                logging.INFO, self.api_key, "quota",
+                "API quota of key %s exhausted, pausing requests for %.0f s",
+                mask_key(self.api_key), pause,
+            )
+            async_get_key_pool(self.hass).async_mark_exhausted(self.api_key, pause)
+        elif error_data.get("status") == HTTP_UNAUTHORIZED:
+            async_get_key_pool(self.hass).async_mark_invalid(self.api_key)
+
+    def next_refresh_interval(self):
+        """Return the number of seconds until this vehicle should be polled again.
+
+        Technical data practically never changes and valid_until only changes
+        after an inspection, so the interval is derived from the days left
+        until expiry: weekly when far away, tightening towards expiry and
+        staying hourly right after it, when a renewal is expected.
+        """
+        if self.retry.pending:
+            # Honour Retry-After / backoff instead of the regular schedule
+            return self.retry.delay
+        if not self._cached_data:
+            # Nothing fetched yet - retry soon
+            return DEFAULT_UPDATE_INTERVAL
+
+        days = days_until_expiry(self._cached_data.valid_until)
+        if days is None:
+            return REFRESH_INTERVAL_NO_EXPIRY
+        for min_days, interval in REFRESH_INTERVALS:
+            if days > min_days:
+                return interval
+        if -days > REFRESH_EXPIRED_LONG_DAYS:
+            return REFRESH_INTERVAL_EXPIRED_LONG
+        return REFRESH_INTERVAL_EXPIRED
+
+    def next_refresh_delay(self):
+        """Return the number of seconds until the current data becomes stale."""
+        refreshed = max(
+            (time for time in (self._last_request_time, self._registry_restored_at) if time is not None),
+            default=None,
+        )
+        if refreshed is None:
+            return 0
+        elapsed = (dt_util.utcnow() - refreshed).total_seconds()
+        return max(0, self.next_refresh_interval() - elapsed)
+
+    @property
+    def priority(self):
+        """Return the scheduling priority; vehicles closer to expiry go first."""
+        if not self._cached_data or not self._cached_data.valid_until:
+            return -1
+        days_remaining = calculate_days_remaining(self._cached_data.valid_until)
+        return -1 if days_remaining is None else days_remaining
+
+    def _has_data_changed(self, new_data):
+        """Check if new data is different from cached data.
+
+        Records only hold fields taken from the API response; the
+        time-dependent days_remaining and status are derived on read.
+        """
+        if not self._cached_data:
+            return True  # First time, consider it changed
+        if new_data is self._cached_data:
+            return False  # Unchanged payload hash
+        
+        return new_data != self._cached_data
+
+
+class STKczechrFleetCoordinator:
+    """Schedule API fetches for all vehicles sharing one API key.
+
+    A single timer is armed for the earliest due vehicle instead of one timer
+    per config entry. Due vehicles are ordered by due time (staleness) and then
+    by how close their STK expiry is. Results fan out to entities through the
+    per-VIN coordinators' listeners.
+    """
+
+    def __init__(self, hass: HomeAssistant, api_key):
+        """Initialize."""
+        self.hass = hass
+        self.api_key = api_key
+        self._coordinators = set()
+        self._queue = []  # heap of (due, priority, sequence, coordinator)
+        self._due = {}  # coordinator -> due time of its live queue entry
+        self._in_progress = set()
+        self._sequence = itertools.count()
+        self._unsub_timer = None
+        self._timer_due = None
+        self._next_stagger = 0
+
+    def is_refreshing(self, coordinator):
+        """Return True while a vehicle's refresh is running."""
+        return coordinator in self._in_progress
+
+    def remaining_delay(self, coordinator):
+        """Return the seconds until a vehicle is due, or 0 when it is not queued."""
+        due = self._due.get(coordinator)
+        return 0 if due is None else max(0, due - self.hass.loop.time())
+
+    @property
+    def coordinators(self):
+        """Return the per-VIN coordinators owned by this fleet."""
+        return self._coordinators
+
+    @callback
+    def async_add_vehicle(self, coordinator, delay=0, stagger=True):
+        """Start scheduling a vehicle, first polling it after `delay` seconds.
+
+        Vehicles that already have (restored) data but are due now are spread
+        over the API quota instead of all being refreshed at once; vehicles
+        without any data keep the first slots.
+        """
+        self._coordinators.add(coordinator)
+        if stagger and delay <= 0 and coordinator.data:
+            delay = self._async_stagger_delay()
+        self.async_schedule(coordinator, delay)
+
+    @callback
+    def _async_stagger_delay(self):
+        """Return the delay of the next free background refresh slot."""
+        now = self.hass.loop.time()
+        self._next_stagger = max(self._next_stagger, now) + API_RATE_PERIOD / API_RATE_LIMIT
+        return self._next_stagger - now
+
+    @callback
+    def async_remove_vehicle(self, coordinator):
+        """Stop scheduling a vehicle; its stale queue entry is skipped lazily."""
+        self._coordinators.discard(coordinator)
+        self._due.pop(coordinator, None)
+        if not self._coordinators:
+            self.async_shutdown()
+
+    @callback
+    def async_schedule(self, coordinator, delay):
+        """(Re)schedule a vehicle to be polled after `delay` seconds."""
+        due = self.hass.loop.time() + max(0, delay)
+        self._due[coordinator] = due
+        heapq.heappush(self._queue, (due, coordinator.priority, next(self._sequence), coordinator))
+        self._async_arm_timer()
+
+    @callback
+    def async_shutdown(self):
+        """Cancel the timer and drop the queue."""
+        if self._unsub_timer:
+            self._unsub_timer()
+            self._unsub_timer = None
+        self._timer_due = None
+        self._queue.clear()
+        self._due.clear()
+
+    def _pop_stale(self):
+        """Drop queue entries that were superseded or belong to removed vehicles."""
+        while self._queue:
+            due, _, _, coordinator = self._queue[0]
+            if self._due.get(coordinator) == due:
+                return
+            heapq.heappop(self._queue)
+
+    @callback
+    def _async_arm_timer(self):
+        """Arm the single fleet timer for the earliest due vehicle."""
+        self._pop_stale()
+        if not self._queue:
+            return
+        head_due = self._queue[0][0]
+        if self._unsub_timer and self._timer_due <= head_due:
+            return
+        if self._unsub_timer:
+            self._unsub_timer()
+        self._timer_due = head_due
+        self._unsub_timer = async_call_later(
+            self.hass, max(0, head_due - self.hass.loop.time()), self._async_process_queue
+        )
+
+    @callback
+    def _async_process_queue(self, _now=None):
+        """Start refreshes for every due vehicle, most urgent first."""
+        self._unsub_timer = None
+        self._timer_due = None
+        now = self.hass.loop.time()
+        while self._queue and self._queue[0][0] <= now:
+            due, _, _, coordinator = heapq.heappop(self._queue)
+            if self._due.get(coordinator) != due:
+                continue
+            del self._due[coordinator]
+            self._in_progress.add(coordinator)
+            self.hass.async_create_background_task(
+                self._async_refresh_vehicle(coordinator),
+                f"{DOMAIN} refresh {coordinator.vin}",
+            )
+        self._async_arm_timer()
+
+    async def async_refresh_now(self, coordinator):
+        """Refresh a vehicle ahead of the routine polls and wait for the result.
+
+        Its queued poll is dropped; the vehicle is rescheduled from the new
+        data like after any other refresh. A routine refresh already in
+        flight is joined and moved to the priority lane. Returns the error of a failed
+        fetch, None on success.
+        """
+        self._due.pop(coordinator, None)
+        self._in_progress.add(coordinator)
+        return await self._async_refresh_vehicle(coordinator, priority=True)
+
+    async def _async_refresh_vehicle(self, coordinator, priority=False):
+        """Refresh one vehicle and put it back in the queue.
+
+        Returns the error of a failed fetch, read before a failover resets it.
+        """
+        try:
+            if priority:
+                await coordinator.async_priority_refresh()
+            else:
+                await coordinator.async_refresh()
+            return coordinator.retry.last_error
+        finally:
+            self._in_progress.discard(coordinator)
+            if coordinator in self._coordinators and coordinator not in self._due:
+                self.async_schedule(coordinator, coordinator.next_refresh_interval())
+                # Fail over when this key was rejected or ran out of quota
+                async_move_vehicle(
+                    self.hass, coordinator, async_get_key_pool(self.hass).key_for(coordinator.vin)
+                )
+
+
+@callback
+def async_get_fleet_coordinator(hass: HomeAssistant, api_key):
+    """Return the fleet coordinator for an API key, creating it on first use."""
+    fleets = hass.data.setdefault(DOMAIN, {}).setdefault(DATA_FLEETS, {})
+    if api_key not in fleets:
+        fleets[api_key] = STKczechrFleetCoordinator(hass, api_key)
+    return fleets[api_key]
+
+
+@callback
+def async_remove_fleet_vehicle(hass: HomeAssistant, coordinator):
+    """Remove a vehicle from its fleet, dropping the fleet when it is empty."""
+    fleets = hass.data[DOMAIN][DATA_FLEETS]
+    fleet = fleets.get(coordinator.api_key)
+    if fleet is None:
+        return
+    fleet.async_remove_vehicle(coordinator)
+    if not fleet.coordinators:
+        fleets.pop(coordinator.api_key)
+
+
+@callback
+def async_move_vehicle(hass: HomeAssistant, coordinator, api_key):
+    """Move a vehicle to the fleet of another API key, keeping its due time.
+
+    A vehicle backing off because its key was rejected or out of quota is
+    retried right away on the new key.
+    """
+    if api_key == coordinator.api_key:
+        return
+    fleet = async_get_fleet_coordinator(hass, coordinator.api_key)
+    delay = fleet.remaining_delay(coordinator)
+    if coordinator.retry.last_status in (HTTP_UNAUTHORIZED, HTTP_TOO_MANY_REQUESTS):
+        coordinator.retry.reset()
+        delay = 0
+    async_remove_fleet_vehicle(hass, coordinator)
+    coordinator.async_set_api_key(api_key)
+    async_get_fleet_coordinator(hass, api_key).async_add_vehicle(coordinator, delay, stagger=False)
+    _LOGGER.debug("Moved VIN %s to another API key", coordinator.vin)
+
+
+@callback
+def async_rebalance_fleets(hass: HomeAssistant):
+    """Move every idle vehicle to the key its VIN currently maps to.
+
+    Vehicles that are being refreshed move when their refresh completes.
+    """
+    pool = async_get_key_pool(hass)
+    for fleet in list(hass.data.get(DOMAIN, {}).get(DATA_FLEETS, {}).values()):
+        for coordinator in list(fleet.coordinators):
+            if not fleet.is_refreshing(coordinator):
+                async_move_vehicle(hass, coordinator, pool.key_for(coordinator.vin))
+
+
+@callback
+def async_get_vehicle_coordinators(hass: HomeAssistant, vin=None):
+    """Return the per-VIN coordinators of all fleets, optionally for one VIN."""
+    return [
+        coordinator
+        for fleet in hass.data.get(DOMAIN, {}).get(DATA_FLEETS, {}).values()
+        for coordinator in fleet.coordinators
+        if vin is None or coordinator.vin == vin
+    ]
@@ -0,0 +1,64 @@
+"""Diagnostics support for STK czechr."""
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN, DATA_FLEETS, DATA_RATE_LIMITERS, CONF_API_KEY, CONF_VIN
+from .api import async_get_single_flight
+from .key_pool import async_get_key_pool, mask_key
+from .metrics import async_get_metrics, data_age
+from .models import VehicleRecord
+from .registry import async_get_registry
+
+TO_REDACT = {CONF_API_KEY}
+
+
+async def async_get_config_entry_diagnostics(hass: HomeAssistant, entry: ConfigEntry):
+    """Return diagnostics for a config entry."""
+    coordinator = hass.data[DOMAIN][entry.entry_id]
+    data = coordinator.data
+    return {
+        "entry": async_redact_data(entry.as_dict(), TO_REDACT),
+        "vehicle": {
+            "vin": entry.data[CONF_VIN],
+            "api_key": mask_key(coordinator.api_key),
+            "last_update_success": coordinator.last_update_success,
+            "last_fetch": coordinator.last_fetch.isoformat() if coordinator.last_fetch else None,
+            "data_age": data_age(coordinator),
+            "next_refresh_interval": coordinator.next_refresh_interval(),
+            "retry": coordinator.retry.as_dict(),
+            "data": data.as_dict() if isinstance(data, VehicleRecord) else data,
+        },
+        "rate_limiter": coordinator.rate_limiter.metrics,
+        "api_keys": _api_key_usage(hass),
+        "metrics": {
+            **async_get_metrics(hass).as_dict(),
+            "coalesced_requests": async_get_single_flight(hass).coalesced,
+        },
+        "registry": _registry_metadata(hass),
+    }
+
+
+def _registry_metadata(hass: HomeAssistant):
+    """Return the statistics of the imported registry export, if any."""
+    registry = async_get_registry(hass)
+    if registry is None:
+        return None
+    return {**registry.metadata, "import_progress": registry.progress}
+
+
+def _api_key_usage(hass: HomeAssistant):
+    """Return the state and usage of every key in the pool, keys masked."""
+    key_pool = async_get_key_pool(hass)
+    fleets = hass.data[DOMAIN].get(DATA_FLEETS, {})
+    limiters = hass.data[DOMAIN].get(DATA_RATE_LIMITERS, {})
+    return [
+        {
+            "api_key": mask_key(api_key),
+            "state": key_pool.key_state(api_key),
+            "failovers": key_pool.failovers(api_key),
+            "vehicles": len(fleets[api_key].coordinators) if api_key in fleets else 0,
+            "rate_limiter": limiters[api_key].metrics if api_key in limiters else None,
+        }
+        for api_key in key_pool.keys
+    ]
@@ -0,0 +1,118 @@
+"""Timer-driven STK expiry events."""
+import logging
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.helpers.event import async_track_point_in_time
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    EVENT_STK_EXPIRED,
+    EVENT_STK_RENEWED,
+    EVENT_STK_WARNING,
+    SIGNAL_FLEET_UPDATED,
+    STKStatus,
+)
+from .expiry_index import async_get_expiry_index
+from .models import VehicleRecord
+from .util import calculate_days_remaining, status_changes
+
+_LOGGER = logging.getLogger(__name__)
+
+STATUS_EVENTS = {
+    STKStatus.WARNING: EVENT_STK_WARNING,
+    STKStatus.EXPIRED: EVENT_STK_EXPIRED,
+}
+
+
+class STKExpiryTracker:
+    """Fire bus events when a vehicle's STK enters the warning period or expires.
+
+    One point-in-time timer is armed per upcoming status change. Timers are
+    only re-armed when valid_until changes, so neither the events nor the
+    state update at the threshold need an API call. The fleet expiry index
+    is updated at the same moment.
+    """
+
+    def __init__(self, hass: HomeAssistant, coordinator, entry_id):
+        """Initialize."""
+        self.hass = hass
+        self.coordinator = coordinator
+        self.entry_id = entry_id
+        self._valid_until = None
+        self._unsub_timers = []
+        self._unsub_coordinator = None
+        self._index = async_get_expiry_index(hass)
+
+    @callback
+    def async_start(self):
+        """Arm timers for the current data and follow coordinator updates."""
+        self._unsub_coordinator = self.coordinator.async_add_listener(self._async_data_updated)
+        self._async_data_updated()
+
+    @callback
+    def async_stop(self):
+        """Cancel all timers."""
+        if self._unsub_coordinator:
+            self._unsub_coordinator()
+            self._unsub_coordinator = None
+        self._async_cancel_timers()
+        if self._index.remove(self.entry_id):
+            async_dispatcher_send(self.hass, SIGNAL_FLEET_UPDATED)
+
+    @callback
+    def _async_cancel_timers(self):
+        for unsub in self._unsub_timers:
+            unsub()
+        self._unsub_timers = []
+
+    @callback
+    def _async_data_updated(self):
+        """Re-arm the timers when valid_until changed."""
+        data = self.coordinator.data
+        if not isinstance(data, VehicleRecord):
+            return
+        if self._index.update(
+            self.entry_id, data.valid_until, self.coordinator.vin, self.coordinator.name
+        ):
+            async_dispatcher_send(self.hass, SIGNAL_FLEET_UPDATED)
+        if data.valid_until == self._valid_until:
+            return
+        previous, self._valid_until = self._valid_until, data.valid_until
+        if previous and data.valid_until and data.valid_until > previous:
+            self._async_fire(EVENT_STK_RENEWED, previous_valid_until=previous.isoformat())
+
+        self._async_cancel_timers()
+        now = dt_util.now()
+        for when, status in status_changes(data.valid_until):
+            if when > now:
+                self._unsub_timers.append(
+                    async_track_point_in_time(self.hass, self._async_status_changed(status), when)
+                )
+        _LOGGER.debug(
+            "Armed %s expiry timers for VIN %s (valid until %s)",
+            len(self._unsub_timers), self.coordinator.vin, data.valid_until,
+        )
+
+    def _async_status_changed(self, status):
+        @callback
+        def _async_fire_status(_now):
+            # Entities of this vehicle recompute status and days_remaining now
+            self.coordinator.async_update_listeners()
+            self._async_fire(STATUS_EVENTS[status], status=status)
+
+        return _async_fire_status
+
+    @callback
+    def _async_fire(self, event_type, **extra):
+        """Fire an event for this vehicle."""
+        self.hass.bus.async_fire(
+            event_type,
+            {
+                "vin": self.coordinator.vin,
+                "name": self.coordinator.name,
+                "valid_until": self._valid_until.isoformat() if self._valid_until else None,
+                "days_remaining": calculate_days_remaining(self._valid_until),
+                **extra,
+            },
+        )
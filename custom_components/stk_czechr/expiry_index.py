@@ -0,0 +1,91 @@
+"""Sorted index of the STK expiry dates of the whole fleet.
+
+The index only needs the standard library; it is maintained from
+STKExpiryTracker, i.e. only when a vehicle's valid_until changes.
+"""
+from bisect import bisect_right, insort
+from datetime import timedelta
+from operator import itemgetter
+
+from .const import DOMAIN, DATA_EXPIRY_INDEX, STATUS_WARNING_DAYS, STKStatus
+
+_EXPIRY = itemgetter(0)
+
+
+class ExpiryIndex:
+    """Vehicles sorted by valid_until.
+
+    Vehicles are keyed by config entry ID, since two entries may track the
+    same VIN and are loaded and unloaded independently. Status counts and
+    the next expiring vehicles are answered with binary searches relative
+    to `today`, so they stay correct across midnight without touching the
+    index.
+    """
+
+    def __init__(self):
+        """Initialize an empty index."""
+        self._entries = []  # sorted (valid_until, entry_id), vehicles with a date only
+        self._valid_until = {}  # entry_id -> valid_until (None when unknown)
+        self.vehicles = {}  # entry_id -> (vin, name)
+
+    def __len__(self):
+        """Return the number of indexed vehicles."""
+        return len(self._valid_until)
+
+    def update(self, entry_id, valid_until, vin, name=None):
+        """Insert or move a vehicle; return False when nothing changed."""
+        self.vehicles[entry_id] = (vin, name)
+        if entry_id in self._valid_until:
+            if self._valid_until[entry_id] == valid_until:
+                return False
+            self._discard(entry_id)
+        self._valid_until[entry_id] = valid_until
+        if valid_until is not None:
+            insort(self._entries, (valid_until, entry_id))
+        return True
+
+    def remove(self, entry_id):
+        """Drop a vehicle; return False when it was not indexed."""
+        if entry_id not in self._valid_until:
+            return False
+        self._discard(entry_id)
+        del self._valid_until[entry_id]
+        del self.vehicles[entry_id]
+        return True
+
+    def _discard(self, entry_id):
+        valid_until = self._valid_until[entry_id]
+        if valid_until is None:
+            return
+        position = bisect_right(self._entries, (valid_until, entry_id)) - 1
+        del self._entries[position]
+
+    def _expired_end(self, today):
+        """Return the position after the last expired vehicle (valid_until <= today)."""
+        return bisect_right(self._entries, today, key=_EXPIRY)
+
+    def counts(self, today):
+        """Return the number of vehicles per STKStatus, mirroring determine_status()."""
+        expired = self._expired_end(today)
+        warning = bisect_right(
+            self._entries, today + timedelta(days=STATUS_WARNING_DAYS), key=_EXPIRY
+        )
+        return {
+            STKStatus.EXPIRED: expired,
+            STKStatus.WARNING: warning - expired,
+            STKStatus.VALID: len(self._entries) - warning,
+            STKStatus.UNKNOWN: len(self._valid_until) - len(self._entries),
+        }
+
+    def upcoming(self, today, count=10):
+        """Return [(valid_until, entry_id)] of the next `count` vehicles to expire."""
+        start = self._expired_end(today)
+        return self._entries[start:start + count]
+
+
+def async_get_expiry_index(hass):
+    """Return the integration-wide expiry index, creating it on first use."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    if DATA_EXPIRY_INDEX not in domain_data:
+        domain_data[DATA_EXPIRY_INDEX] = ExpiryIndex()
+    return domain_data[DATA_EXPIRY_INDEX]
@@ -0,0 +1,191 @@
+"""Local SQLite history of inspection and registration changes.
+
+Only changes of HISTORY_TRACKED_FIELDS are stored, one row per field and
+change, so the table grows with real events instead of with state writes.
+The database module needs only the standard library.
+"""
+from datetime import date, timezone
+import logging
+import sqlite3
+import threading
+
+from .const import DOMAIN, DATA_HISTORY, HISTORY_TRACKED_FIELDS
+
+_LOGGER = logging.getLogger(__name__)
+
+# Rows are clustered by (field, changed_at), so reports such as "renewals
+# last quarter" read one contiguous range; VIN and expiry date lookups go
+# through secondary indexes.
+SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS changes (
+        vin TEXT NOT NULL,
+        field TEXT NOT NULL,
+        old_value TEXT,
+        new_value TEXT,
+        valid_until TEXT,
+        changed_at TEXT NOT NULL,
+        PRIMARY KEY (field, changed_at, vin)
+    ) WITHOUT ROWID
+    """,
+    "CREATE INDEX IF NOT EXISTS changes_vin ON changes (vin, changed_at)",
+    "CREATE INDEX IF NOT EXISTS changes_valid_until ON changes (valid_until)",
+    "CREATE INDEX IF NOT EXISTS changes_field_valid_until ON changes (field, valid_until)",
+)
+COLUMNS = ("vin", "field", "old_value", "new_value", "valid_until", "changed_at")
+
+
+def _to_text(value):
+    """Store dates as ISO strings, so they compare correctly in SQL."""
+    if value is None:
+        return None
+    if isinstance(value, date):
+        return value.isoformat()
+    return str(value)
+
+
+def _timestamp(value):
+    """Return a fixed-width UTC timestamp, which sorts correctly as text."""
+    if value is None:
+        return None
+    return value.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+class HistoryDatabase:
+    """Blocking access to the history database; call from the executor."""
+
+    def __init__(self, path):
+        """Open (and create) the database."""
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        try:
+            with self._lock, self._connection:
+                self._connection.execute("PRAGMA journal_mode=WAL")
+                for statement in SCHEMA:
+                    self._connection.execute(statement)
+        except sqlite3.Error:
+            self._connection.close()
+            raise
+
+    def record_changes(self, vin, old_record, new_record, changed_at):
+        """Append a row per tracked field that differs; return the number of rows.
+
+        Without an old record the current values are stored as a baseline
+        (old_value NULL).
+        """
+        valid_until = _to_text(new_record.valid_until)
+        rows = []
+        for field in HISTORY_TRACKED_FIELDS:
+            new_value = getattr(new_record, field)
+            old_value = getattr(old_record, field) if old_record is not None else None
+            if old_record is not None and new_value == old_value:
+                continue
+            rows.append(
+                (
+                    vin,
+                    field,
+                    _to_text(old_value),
+                    _to_text(new_value),
+                    valid_until,
+                    _timestamp(changed_at),
+                )
+            )
+        if rows:
+            with self._lock, self._connection:
+                self._connection.executemany(
+                    "INSERT OR IGNORE INTO changes (vin, field, old_value, new_value, valid_until, changed_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+        return len(rows)
+
+    def query(
+        self,
+        vin=None,
+        field=None,
+        since=None,
+        until=None,
+        valid_from=None,
+        valid_to=None,
+        renewals=False,
+        limit=1000,
+    ):
+        """Return matching changes, newest first.
+
+        `since`/`until` bound the time of the change, `valid_from`/`valid_to`
+        the valid_until date after it. `renewals` selects valid_until changes
+        to a later date, i.e. passed inspections.
+        """
+        clauses = []
+        params = []
+        if renewals:
+            field = "valid_until"
+            clauses.append("old_value IS NOT NULL AND new_value > old_value")
+        for column, operator, value in (
+            ("vin", "=", vin),
+            ("field", "=", field),
+            ("changed_at", ">=", _timestamp(since)),
+            ("changed_at", "<", _timestamp(until)),
+            ("valid_until", ">=", _to_text(valid_from)),
+            ("valid_until", "<=", _to_text(valid_to)),
+        ):
+            if value is not None:
+                clauses.append(f"{column} {operator} ?")
+                params.append(value)
+        sql = f"SELECT {', '.join(COLUMNS)} FROM changes"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY changed_at DESC LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self._connection.execute(sql, params).fetchall()
+        return [dict(zip(COLUMNS, row)) for row in rows]
+
+    def close(self):
+        """Close the database."""
+        with self._lock:
+            self._connection.close()
+
+
+class STKHistory:
+    """Non-blocking wrapper running every database call in the executor."""
+
+    def __init__(self, hass, database):
+        """Initialize."""
+        self.hass = hass
+        self._database = database
+        self._recorded = {}  # vin -> last record stored
+
+    async def async_record(self, vin, old_record, new_record, changed_at):
+        """Store the changes between two records of a VIN.
+
+        Entries tracking the same VIN share one fetch and each report its
+        change; only the first report of a record is stored.
+        """
+        if self._recorded.get(vin) == new_record:
+            return
+        self._recorded[vin] = new_record
+        try:
+            count = await self.hass.async_add_executor_job(
+                self._database.record_changes, vin, old_record, new_record, changed_at
+            )
+        except sqlite3.Error as err:
+            _LOGGER.error("Could not store the history of VIN %s: %s", vin, err)
+            if self._recorded.get(vin) is new_record:
+                del self._recorded[vin]
+            return
+        if count:
+            _LOGGER.debug("Stored %s changes of VIN %s", count, vin)
+
+    async def async_query(self, **kwargs):
+        """Query the stored changes, see HistoryDatabase.query()."""
+        return await self.hass.async_add_executor_job(lambda: self._database.query(**kwargs))
+
+    async def async_close(self):
+        """Close the database."""
+        await self.hass.async_add_executor_job(self._database.close)
+
+
+def async_get_history(hass):
+    """Return the history store, or None when the integration has not been set up."""
+    return hass.data.get(DOMAIN, {}).get(DATA_HISTORY)
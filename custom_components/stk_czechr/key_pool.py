@@ -0,0 +1,175 @@
+"""Pool of API keys with consistent-hash VIN sharding."""
+from bisect import bisect
+import hashlib
+import logging
+import time
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
+
+from .const import DOMAIN, DATA_KEY_POOL, KEY_POOL_VIRTUAL_NODES
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def _ring_hash(value):
+    """Return a hash that is stable across restarts (unlike hash())."""
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "big")
+
+
+def mask_key(api_key):
+    """Return an API key shortened for logs and diagnostics."""
+    return f"…{api_key[-4:]}" if len(api_key) > 8 else "…"
+
+
+class ApiKeyPool:
+    """API keys shared by all vehicles, each VIN sharded to one key.
+
+    Keys come from configuration.yaml and from the config entries. A VIN maps
+    to the first key clockwise from its hash on a ring of virtual nodes, so
+    adding or removing a key only moves the VINs of that key. Keys that were
+    rejected (401) or ran out of quota (429) are skipped, which fails their
+    VINs over to the next key on the ring until the key recovers.
+    """
+
+    def __init__(self, hass: HomeAssistant):
+        """Initialize an empty pool."""
+        self.hass = hass
+        self._refs = {}  # key -> number of config entries using it, None for YAML keys
+        self._ring = []  # sorted (hash, key)
+        self._hashes = []
+        self._invalid = set()
+        self._exhausted_until = {}  # key -> time.monotonic() when the quota is back
+        self._failovers = {}
+        self._listeners = []
+
+    @property
+    def keys(self):
+        """Return the keys of the pool."""
+        return list(self._refs)
+
+    def __contains__(self, api_key):
+        """Return whether a key is configured."""
+        return api_key in self._refs
+
+    @callback
+    def async_add_listener(self, update_callback):
+        """Call `update_callback` whenever VINs may map to a different key."""
+        self._listeners.append(update_callback)
+
+    @callback
+    def _async_notify(self, _now=None):
+        for update_callback in self._listeners:
+            update_callback()
+
+    def _rebuild(self):
+        self._ring = sorted(
+            (_ring_hash(f"{api_key}#{node}"), api_key)
+            for api_key in self._refs
+            for node in range(KEY_POOL_VIRTUAL_NODES)
+        )
+        self._hashes = [ring_hash for ring_hash, _ in self._ring]
+
+    @callback
+    def async_add_key(self, api_key, permanent=False):
+        """Add a key, reference-counted for config entries."""
+        if not api_key:
+            return
+        if api_key in self._refs:
+            if self._refs[api_key] is not None:
+                self._refs[api_key] = None if permanent else self._refs[api_key] + 1
+            return
+        self._refs[api_key] = None if permanent else 1
+        self._failovers.setdefault(api_key, 0)
+        self._rebuild()
+        _LOGGER.debug("API key %s added, %s keys in pool", mask_key(api_key), len(self._refs))
+        self._async_notify()
+
+    @callback
+    def async_remove_key(self, api_key):
+        """Release a config entry's key; it leaves the pool with its last entry."""
+        refs = self._refs.get(api_key)
+        if refs is None:
+            return
+        if refs > 1:
+            self._refs[api_key] = refs - 1
+            return
+        del self._refs[api_key]
+        self._invalid.discard(api_key)
+        self._exhausted_until.pop(api_key, None)
+        self._rebuild()
+        self._async_notify()
+
+    def _available(self, api_key, now):
+        return api_key not in self._invalid and self._exhausted_until.get(api_key, 0) <= now
+
+    def key_for(self, vin):
+        """Return the key serving a VIN, or "" when the pool is empty.
+
+        When every key is unavailable the VIN stays on its home key, whose
+        limiter is paused until the quota is back.
+        """
+        if not self._ring:
+            return ""
+        now = time.monotonic()
+        start = bisect(self._hashes, _ring_hash(vin))
+        seen = set()
+        for offset in range(len(self._ring)):
+            api_key = self._ring[(start + offset) % len(self._ring)][1]
+            if api_key in seen:
+                continue
+            if self._available(api_key, now):
+                return api_key
+            seen.add(api_key)
+            if len(seen) == len(self._refs):
+                break
+        return self._ring[start % len(self._ring)][1]
+
+    @callback
+    def async_mark_invalid(self, api_key):
+        """Stop using a key the API rejected (401) until it is re-added."""
+        if api_key not in self._refs or api_key in self._invalid:
+            return
+        _LOGGER.warning("API key %s was rejected, moving its vehicles to other keys", mask_key(api_key))
+        self._invalid.add(api_key)
+        self._failovers[api_key] += 1
+        self._async_notify()
+
+    @callback
+    def async_mark_exhausted(self, api_key, seconds):
+        """Skip a key whose quota is exhausted for `seconds`."""
+        if api_key not in self._refs or len(self._refs) < 2:
+            return
+        until = time.monotonic() + seconds
+        if until <= self._exhausted_until.get(api_key, 0):
+            return
+        self._exhausted_until[api_key] = until
+        self._failovers[api_key] += 1
+        _LOGGER.info(
+            "API key %s is out of quota, moving its vehicles to other keys for %.0f s",
+            mask_key(api_key), seconds,
+        )
+        self._async_notify()
+        # Move the VINs back once the quota is available again
+        async_call_later(self.hass, seconds, self._async_notify)
+
+    def key_state(self, api_key):
+        """Return "ok", "exhausted" or "invalid"."""
+        if api_key in self._invalid:
+            return "invalid"
+        if self._exhausted_until.get(api_key, 0) > time.monotonic():
+            return "exhausted"
+        return "ok"
+
+    def failovers(self, api_key):
+        """Return how often a key's vehicles were moved to other keys."""
+        return self._failovers.get(api_key, 0)
+
+
+@callback
+def async_get_key_pool(hass: HomeAssistant):
+    """Return the integration-wide API key pool, creating it on first use."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    if DATA_KEY_POOL not in domain_data:
+        domain_data[DATA_KEY_POOL] = ApiKeyPool(hass)
+    return domain_data[DATA_KEY_POOL]
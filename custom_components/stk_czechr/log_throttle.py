@@ -0,0 +1,46 @@
+"""Rate-limited, deduplicated warnings for failing vehicles."""
+import logging
+import time
+
+from .const import LOG_THROTTLE_INTERVAL
+
+
+class LogThrottle:
+    """Log a repeated failure once per interval instead of on every attempt.
+
+    Messages are keyed by (VIN, error class); repeats within the interval
+    are counted and reported with the next message that gets through.
+    """
+
+    def __init__(self, logger, interval=LOG_THROTTLE_INTERVAL):
+        """Initialize."""
+        self._logger = logger
+        self._interval = interval
+        self._last = {}  # vin -> {error class: (time.monotonic() of last log, suppressed)}
+
+    def log(self, level, vin, error_class, msg, *args):
+        """Log `msg` unless the same failure of this VIN was logged recently."""
+        failures = self._last.setdefault(vin, {})
+        now = time.monotonic()
+        last = failures.get(error_class)
+        if last is not None and now - last[0] < self._interval:
+            failures[error_class] = (last[0], last[1] + 1)
+            return False
+        failures[error_class] = (now, 0)
+        if last is not None and last[1]:
+            msg += " (%s similar messages suppressed)"
+            args = (*args, last[1])
+        self._logger.log(level, msg, *args)
+        return True
+
+    def warning(self, vin, error_class, msg, *args):
+        """Log a throttled warning."""
+        return self.log(logging.WARNING, vin, error_class, msg, *args)
+
+    def error(self, vin, error_class, msg, *args):
+        """Log a throttled error."""
+        return self.log(logging.ERROR, vin, error_class, msg, *args)
+
+    def reset(self, vin):
+        """Forget the failures of a VIN after it recovered; return True if there were any."""
+        return self._last.pop(vin, None) is not None
@@ -0,0 +1,183 @@
+"""Runtime metrics of the fetch pipeline."""
+from bisect import bisect_left
+from collections import defaultdict
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.util import dt as dt_util
+
+from .const import DOMAIN, DATA_METRICS
+
+# Histogram bucket upper bounds in seconds
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+WAIT_BUCKETS = (0.1, 1, 5, 15, 60, 300, 900, 3600)
+
+
+class Histogram:
+    """Fixed-bucket histogram with Prometheus (cumulative) semantics."""
+
+    def __init__(self, buckets):
+        """Initialize with sorted bucket upper bounds."""
+        self.buckets = tuple(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        """Record one observation."""
+        self._counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self):
+        """Return [(upper bound, observations <= bound)], ending with +Inf."""
+        result = []
+        total = 0
+        for bound, count in zip((*self.buckets, float("inf")), self._counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+    def as_dict(self):
+        """Return the histogram for diagnostics."""
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 3),
+            "average": round(self.sum / self.count, 3) if self.count else 0.0,
+            "buckets": {
+                ("+Inf" if bound == float("inf") else str(bound)): count
+                for bound, count in self.cumulative()
+            },
+        }
+
+
+class STKMetrics:
+    """Counters and histograms shared by every vehicle of the integration.
+
+    Request outcomes are keyed by HTTP status, or "timeout" / "error" when no
+    response arrived. A cache hit is a fetch answered without parsing: the
+    payload hash matched, or the minimum request interval served the cached
+    record.
+    """
+
+    def __init__(self):
+        """Initialize."""
+        self.requests = defaultdict(int)
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.retries = defaultdict(int)
+
+    @callback
+    def record_request(self, status, duration):
+        """Record one API call and its latency."""
+        self.requests[str(status)] += 1
+        self.latency.observe(duration)
+
+    @callback
+    def record_retry(self, reason):
+        """Record a failed fetch that was scheduled for a retry."""
+        self.retries[str(reason)] += 1
+
+    def as_dict(self):
+        """Return the metrics for diagnostics."""
+        return {
+            "requests": dict(self.requests),
+            "latency": self.latency.as_dict(),
+            "cache": {"hits": self.cache_hits, "misses": self.cache_misses},
+            "retries": dict(self.retries),
+        }
+
+
+@callback
+def async_get_metrics(hass: HomeAssistant):
+    """Return the integration-wide metrics, creating them on first use."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    if DATA_METRICS not in domain_data:
+        domain_data[DATA_METRICS] = STKMetrics()
+    return domain_data[DATA_METRICS]
+
+
+def data_age(coordinator, now=None):
+    """Return the age in seconds of a vehicle's data, or None before the first fetch."""
+    if coordinator.last_fetch is None:
+        return None
+    return ((now or dt_util.utcnow()) - coordinator.last_fetch).total_seconds()
+
+
+def _escape(value):
+    """Escape a Prometheus label value."""
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(**labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def _format_bound(bound):
+    return "+Inf" if bound == float("inf") else repr(float(bound))
+
+
+def _histogram_lines(name, histogram, **labels):
+    for bound, count in histogram.cumulative():
+        yield f"{name}_bucket{_labels(**labels, le=_format_bound(bound))} {count}"
+    yield f"{name}_sum{_labels(**labels)} {histogram.sum}"
+    yield f"{name}_count{_labels(**labels)} {histogram.count}"
+
+
+def render_prometheus(metrics, rate_limiters, single_flight, coordinators):
+    """Return all metrics in the Prometheus text exposition format.
+
+    Rate limiters are labelled by their position, never by the API key.
+    """
+    lines = [
+        "# HELP stk_czechr_api_requests_total API calls by HTTP status.",
+        "# TYPE stk_czechr_api_requests_total counter",
+    ]
+    for status, count in sorted(metrics.requests.items()):
+        lines.append(f"stk_czechr_api_requests_total{_labels(status=status)} {count}")
+
+    lines += [
+        "# HELP stk_czechr_api_latency_seconds API call latency.",
+        "# TYPE stk_czechr_api_latency_seconds histogram",
+        *_histogram_lines("stk_czechr_api_latency_seconds", metrics.latency),
+        "# HELP stk_czechr_cache_total Fetches answered from the cache (hit) or parsed (miss).",
+        "# TYPE stk_czechr_cache_total counter",
+        f"stk_czechr_cache_total{_labels(result='hit')} {metrics.cache_hits}",
+        f"stk_czechr_cache_total{_labels(result='miss')} {metrics.cache_misses}",
+        "# HELP stk_czechr_retries_total Failed fetches scheduled for a retry, by reason.",
+        "# TYPE stk_czechr_retries_total counter",
+    ]
+    for reason, count in sorted(metrics.retries.items()):
+        lines.append(f"stk_czechr_retries_total{_labels(reason=reason)} {count}")
+
+    lines += [
+        "# HELP stk_czechr_coalesced_requests_total Fetches that joined a request already in flight.",
+        "# TYPE stk_czechr_coalesced_requests_total counter",
+        f"stk_czechr_coalesced_requests_total {single_flight.coalesced}",
+        "# HELP stk_czechr_rate_limit_wait_seconds Time spent waiting for a rate limit token.",
+        "# TYPE stk_czechr_rate_limit_wait_seconds histogram",
+    ]
+    for index, limiter in enumerate(rate_limiters):
+        lines.extend(
+            _histogram_lines("stk_czechr_rate_limit_wait_seconds", limiter.wait_histogram, limiter=index)
+        )
+    lines += [
+        "# HELP stk_czechr_rate_limit_queue_depth Callers waiting for a rate limit token.",
+        "# TYPE stk_czechr_rate_limit_queue_depth gauge",
+    ]
+    for index, limiter in enumerate(rate_limiters):
+        lines.append(f"stk_czechr_rate_limit_queue_depth{_labels(limiter=index)} {limiter.queue_depth}")
+
+    lines += [
+        "# HELP stk_czechr_data_age_seconds Time since the last successful fetch of a VIN.",
+        "# TYPE stk_czechr_data_age_seconds gauge",
+    ]
+    now = dt_util.utcnow()
+    for coordinator in sorted(coordinators, key=lambda coordinator: coordinator.vin):
+        age = data_age(coordinator, now)
+        if age is not None:
+            lines.append(f"stk_czechr_data_age_seconds{_labels(vin=coordinator.vin)} {age:.0f}")
+
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,86 @@
+"""Data models for STK czechr."""
+from dataclasses import dataclass, fields
+from datetime import date
+
+
+@dataclass(frozen=True, slots=True)
+class VehicleRecord:
+    """Processed technical data of one vehicle.
+
+    The record is immutable and shared by the coordinator and all entities of
+    a vehicle; dates are already parsed, so reading a sensor is a plain
+    attribute access.
+    """
+
+    # Core STK data
+    valid_until: date | None = None
+    brand: str = ""
+    model: str = ""
+    vin: str = ""
+    color: str = ""
+
+    # Numeric values
+    weight: float = 0
+    max_weight: float = 0
+    max_speed: float = 0
+    engine_displacement: float = 0
+    wheelbase: float = 0
+    noise_driving: float = 0
+    owners_count: float = 0
+    operators_count: float = 0
+
+    # Text values
+    tp_number: str = ""
+    orv_number: str = ""
+    engine_power: str = ""
+    fuel_type: str = ""
+    vehicle_type: str = ""
+    category: str = ""
+    status_name: str = ""
+
+    # Dates
+    first_registration: date | None = None
+    first_registration_cz: date | None = None
+
+    # Dimensions
+    length: float = 0
+    width: float = 0
+    height: float = 0
+
+    # Consumption, emissions and noise
+    consumption_city: float = 0
+    consumption_highway: float = 0
+    consumption_combined: float = 0
+    co2_emissions: float = 0
+    noise_stationary: float = 0
+
+    # Tires and raw dimensions
+    tires_front: str = ""
+    tires_rear: str = ""
+    dimensions: str = ""
+
+    def as_dict(self):
+        """Return a JSON serializable dict, dates in ISO format."""
+        return {
+            field.name: value.isoformat() if isinstance(value, date) else value
+            for field in fields(self)
+            for value in (getattr(self, field.name),)
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Build a record from as_dict() output, ignoring unknown keys."""
+        values = {}
+        for name in _FIELD_NAMES & data.keys():
+            value = data[name]
+            if name in DATE_FIELDS and isinstance(value, str):
+                try:
+                    value = date.fromisoformat(value)
+                except ValueError:
+                    value = None
+            values[name] = value
+        return cls(**values)
+
+
+_FIELD_NAMES = frozenset(field.name for field in fields(VehicleRecord))
+DATE_FIELDS = frozenset(("valid_until", "first_registration", "first_registration_cz"))
@@ -0,0 +1,149 @@
+"""Table-driven parsing of dataovozidlech.cz vehicle data.
+
+Every raw API field is read and split exactly once; its parser returns the
+values of all record fields derived from it.
+"""
+from datetime import date
+
+from .models import VehicleRecord
+
+
+def safe_numeric(value):
+    """Safely convert value to numeric, return 0 if conversion fails."""
+    if value is None:
+        return 0
+    if isinstance(value, (int, float)):
+        return value
+    try:
+        cleaned = str(value).strip().replace(",", ".")
+        if cleaned:
+            return float(cleaned)
+    except (ValueError, TypeError):
+        pass
+    return 0
+
+
+def split_parts(value, separator="/"):
+    """Split a raw multi-value string into stripped parts."""
+    if not value:
+        return []
+    return [part.strip() for part in str(value).split(separator)]
+
+
+def parse_text(value):
+    """Return the text value or an empty string."""
+    return value or ""
+
+
+def parse_date(value):
+    """Parse an API date ("YYYY-MM-DD" or ISO datetime) into a date.
+
+    The Czech "D.M.YYYY" format of the open-data exports is accepted too.
+    """
+    if not value:
+        return None
+    value = str(value)
+    try:
+        return date.fromisoformat(value.split("T")[0])
+    except ValueError:
+        pass
+    try:
+        day, month, year = value.strip().split(".")
+        return date(int(year), int(month), int(day))
+    except ValueError:
+        return None
+
+
+def parse_first_numeric(value):
+    """Return the first numeric part, e.g. " / / 115" -> 115.0."""
+    for part in split_parts(value):
+        try:
+            return float(part.replace(",", "."))
+        except ValueError:
+            continue
+    return 0
+
+
+def parse_dimensions(value):
+    """Split "4689/ 1814/ 1461" into (length, width, height, raw string)."""
+    parts = split_parts(value)
+    parts += [""] * (3 - len(parts))
+    return safe_numeric(parts[0]), safe_numeric(parts[1]), safe_numeric(parts[2]), value or ""
+
+
+def parse_consumption(value):
+    """Split "city/ highway/ combined" into its three values.
+
+    A single value (no separators) is the combined consumption.
+    """
+    parts = split_parts(value)
+    if len(parts) == 1:
+        return 0, 0, safe_numeric(parts[0])
+    parts += [""] * (3 - len(parts))
+    return safe_numeric(parts[0]), safe_numeric(parts[1]), safe_numeric(parts[2])
+
+
+def parse_noise_stationary(value):
+    """Return the noise level from "87/ 3750" (dB / engine speed)."""
+    parts = split_parts(value)
+    return safe_numeric(parts[0]) if parts else 0
+
+
+def parse_tires(value):
+    """Split "front;\\nrear;\\n/ ;" into (front axle, rear axle)."""
+    axles = [axle for axle in split_parts(value, ";") if axle]
+    axles += [""] * (2 - len(axles))
+    return axles[0], axles[1]
+
+
+# (raw API field, parser, record fields filled from the parser result)
+FIELD_MAP = (
+    # Core STK data
+    ("PravidelnaTechnickaProhlidkaDo", parse_date, ("valid_until",)),
+    ("TovarniZnacka", parse_text, ("brand",)),
+    ("ObchodniOznaceni", parse_text, ("model",)),
+    ("VIN", parse_text, ("vin",)),
+    ("VozidloKaroserieBarva", parse_text, ("color",)),
+    # Numeric values
+    ("HmotnostiProvozni", safe_numeric, ("weight",)),
+    ("HmotnostiPripPov", safe_numeric, ("max_weight",)),
+    ("NejvyssiRychlost", safe_numeric, ("max_speed",)),
+    ("MotorZdvihObjem", safe_numeric, ("engine_displacement",)),
+    ("RozmeryRozvor", safe_numeric, ("wheelbase",)),
+    ("HlukJizda", safe_numeric, ("noise_driving",)),
+    ("PocetVlastniku", safe_numeric, ("owners_count",)),
+    ("PocetProvozovatelu", safe_numeric, ("operators_count",)),
+    # Text values
+    ("CisloTp", parse_text, ("tp_number",)),
+    ("CisloOrv", parse_text, ("orv_number",)),
+    ("MotorMaxVykon", parse_text, ("engine_power",)),
+    ("Palivo", parse_text, ("fuel_type",)),
+    ("VozidloDruh", parse_text, ("vehicle_type",)),
+    ("Kategorie", parse_text, ("category",)),
+    ("StatusNazev", parse_text, ("status_name",)),
+    # Dates
+    ("DatumPrvniRegistrace", parse_date, ("first_registration",)),
+    ("DatumPrvniRegistraceVCr", parse_date, ("first_registration_cz",)),
+    # Multi-value fields
+    ("Rozmery", parse_dimensions, ("length", "width", "height", "dimensions")),
+    (
+        "SpotrebaNa100Km",
+        parse_consumption,
+        ("consumption_city", "consumption_highway", "consumption_combined"),
+    ),
+    ("EmiseCO2", parse_first_numeric, ("co2_emissions",)),
+    ("HlukStojiciOtacky", parse_noise_stationary, ("noise_stationary",)),
+    ("NapravyPneuRafky", parse_tires, ("tires_front", "tires_rear")),
+)
+
+
+def parse_vehicle_data(vehicle_data):
+    """Build a VehicleRecord from the "Data" object of an API response."""
+    values = {}
+    for raw_field, parser, outputs in FIELD_MAP:
+        parsed = parser(vehicle_data.get(raw_field))
+        if len(outputs) == 1:
+            values[outputs[0]] = parsed
+        else:
+            values.update(zip(outputs, parsed))
+    return VehicleRecord(**values)
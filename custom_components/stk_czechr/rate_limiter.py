@@ -0,0 +1,163 @@
+"""Shared token-bucket rate limiter for the dataovozidlech.cz API."""
+import asyncio
+import logging
+import time
+
+from homeassistant.core import HomeAssistant, callback
+
+from .const import DOMAIN, DATA_RATE_LIMITERS, API_RATE_LIMIT, API_RATE_PERIOD, API_RATE_BURST
+from .metrics import WAIT_BUCKETS, Histogram
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class TokenBucketRateLimiter:
+    """Token bucket shared by every coordinator that uses the same API key.
+
+    Requests on the priority lane (refreshes asked for by the user) take the
+    next token ahead of every routine poll, but draw from the same quota.
+    """
+
+    def __init__(self, rate=API_RATE_LIMIT, period=API_RATE_PERIOD, capacity=API_RATE_BURST):
+        """Initialize the bucket full, refilling `rate` tokens every `period` seconds."""
+        self._fill_rate = rate / period
+        self._capacity = capacity
+        self._tokens = float(self._capacity)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+        self._priority_lock = asyncio.Lock()
+        self._priority_waiting = 0
+        self._priority_idle = asyncio.Event()
+        self._priority_idle.set()
+
+        # Metrics
+        self._queue_depth = 0
+        self._max_queue_depth = 0
+        self._acquired = 0
+        self._priority_acquired = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+        self._last_wait = 0.0
+        self.wait_histogram = Histogram(WAIT_BUCKETS)
+
+    def _refill(self):
+        """Add the tokens accumulated since the last refill."""
+        now = time.monotonic()
+        self._tokens = min(self._capacity, self._tokens + (now - self._updated) * self._fill_rate)
+        self._updated = now
+
+    async def acquire(self, priority=False, promoted=None):
+        """Wait until a token is available and consume it.
+
+        A routine request moves to the priority lane when the `promoted`
+        event is set while it waits, e.g. because the user asked for a
+        refresh that joined it.
+        """
+        if priority or promoted is None:
+            return await self._acquire(priority)
+        routine = asyncio.ensure_future(self._acquire(False))
+        promotion = asyncio.ensure_future(promoted.wait())
+        try:
+            await asyncio.wait((routine, promotion), return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            promotion.cancel()
+            if not routine.done():
+                routine.cancel()
+        await asyncio.wait((routine,))
+        if not routine.cancelled():
+            return routine.result()
+        _LOGGER.debug("Request promoted to the priority lane")
+        return await self._acquire(True)
+
+    async def _acquire(self, priority):
+        """Wait for a token on one lane.
+
+        Waiters of each lane are served in FIFO order because only the head
+        of the lane holds its lock while it sleeps for the next token. The
+        routine head steps back while any priority request is waiting.
+        """
+        started = time.monotonic()
+        self._queue_depth += 1
+        self._max_queue_depth = max(self._max_queue_depth, self._queue_depth)
+        if priority:
+            self._priority_waiting += 1
+            self._priority_idle.clear()
+        try:
+            async with self._priority_lock if priority else self._lock:
+                while True:
+                    if not priority and self._priority_waiting:
+                        await self._priority_idle.wait()
+                        continue
+                    paused_for = self._paused_until - time.monotonic()
+                    if paused_for > 0:
+                        await asyncio.sleep(paused_for)
+                        continue
+                    self._refill()
+                    if self._tokens >= 1:
+                        break
+                    await asyncio.sleep((1 - self._tokens) / self._fill_rate)
+                self._tokens -= 1
+        finally:
+            self._queue_depth -= 1
+            if priority:
+                self._priority_waiting -= 1
+                if not self._priority_waiting:
+                    self._priority_idle.set()
+
+        waited = time.monotonic() - started
+        self._acquired += 1
+        if priority:
+            self._priority_acquired += 1
+        self._total_wait += waited
+        self._last_wait = waited
+        self._max_wait = max(self._max_wait, waited)
+        self.wait_histogram.observe(waited)
+        if waited >= 1:
+            _LOGGER.debug("Waited %.1f s for API rate limit token", waited)
+        return waited
+
+    def pause(self, seconds):
+        """Hand out no tokens for `seconds`, e.g. after a 429 response.
+
+        The server rejected a request although the bucket had a token, so the
+        quota is exhausted for every VIN of this API key, not just one.
+        """
+        now = time.monotonic()
+        self._paused_until = max(self._paused_until, now + seconds)
+        self._tokens = 0
+        self._updated = now
+        _LOGGER.debug("Rate limiter paused for %.0f s", seconds)
+
+    @property
+    def queue_depth(self):
+        """Return the number of callers currently waiting for a token."""
+        return self._queue_depth
+
+    @property
+    def metrics(self):
+        """Return limiter metrics."""
+        self._refill()
+        return {
+            "capacity": self._capacity,
+            "tokens_available": round(self._tokens, 2),
+            "paused_for": round(max(0.0, self._paused_until - time.monotonic()), 1),
+            "queue_depth": self._queue_depth,
+            "max_queue_depth": self._max_queue_depth,
+            "acquired": self._acquired,
+            "priority_acquired": self._priority_acquired,
+            "wait_time_total": round(self._total_wait, 3),
+            "wait_time_average": round(self._total_wait / self._acquired, 3) if self._acquired else 0.0,
+            "wait_time_max": round(self._max_wait, 3),
+            "wait_time_last": round(self._last_wait, 3),
+            "wait_time": self.wait_histogram.as_dict(),
+        }
+
+
+@callback
+def async_get_rate_limiter(hass: HomeAssistant, api_key):
+    """Return the limiter for an API key, creating it on first use."""
+    limiters = hass.data.setdefault(DOMAIN, {}).setdefault(DATA_RATE_LIMITERS, {})
+    if api_key not in limiters:
+        limiters[api_key] = TokenBucketRateLimiter()
+    return limiters[api_key]
@@ -0,0 +1,497 @@
+"""Offline VIN index over the open-data export of the vehicle registry.
+
+The registry behind dataovozidlech.cz is also published as bulk CSV
+exports. The import splits such a file into byte ranges, normalizes every
+row with the same parsers as the API data in a process pool and merges the
+sorted results into a SQLite file with one compact row per VIN, so a
+multi-GB export is never held in memory and parsing it does not compete
+with Home Assistant for the GIL. The module and the integration modules it
+imports need only the standard library; the workers load it without the
+package __init__ (see registry_worker.py), so they do not import Home
+Assistant.
+"""
+from dataclasses import fields
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, datetime, timezone
+import csv
+import heapq
+import json
+import logging
+import multiprocessing
+from operator import attrgetter, itemgetter
+import os
+from pathlib import Path
+import re
+import runpy
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import unicodedata
+
+from .const import DOMAIN, DATA_REGISTRY, REGISTRY_CHUNK_SIZE, REGISTRY_WORKERS
+from .models import DATE_FIELDS, VehicleRecord
+from .parser import FIELD_MAP, parse_vehicle_data
+
+_LOGGER = logging.getLogger(__name__)
+
+SCHEMA = (
+    """
+    CREATE TABLE vehicles (
+        vin TEXT PRIMARY KEY,
+        valid_until TEXT,
+        record TEXT NOT NULL
+    ) WITHOUT ROWID
+    """,
+    "CREATE TABLE metadata (key TEXT PRIMARY KEY, value TEXT)",
+)
+# Runs and the merge are ordered by (VIN, valid_until)
+_RUN_KEY = itemgetter(0, 1)
+# Bytes read at a time while looking for record boundaries
+_SCAN_BLOCK_SIZE = 2**20
+# Run by each spawned worker before its first job, as a module of this package
+_WORKER_STARTUP = (
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "registry_worker.py"),
+    None,
+    f"{__package__}.registry_worker",
+)
+
+# Record values are stored as a JSON array in field order
+RECORD_FIELDS = tuple(field.name for field in fields(VehicleRecord))
+_RECORD_VALUES = attrgetter(*RECORD_FIELDS)
+_ENCODER = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+_DATE_POSITIONS = tuple(
+    position for position, name in enumerate(RECORD_FIELDS) if name in DATE_FIELDS
+)
+
+# Export column labels that do not spell the API field name
+COLUMN_ALIASES = {
+    "Datum 1. registrace": "DatumPrvniRegistrace",
+    "Datum 1. registrace v ČR": "DatumPrvniRegistraceVCr",
+    "Kategorie vozidla": "Kategorie",
+    "Druh vozidla": "VozidloDruh",
+    "Barva": "VozidloKaroserieBarva",
+    "Zdvihový objem": "MotorZdvihObjem",
+    "Max. výkon / otáčky": "MotorMaxVykon",
+    "Provozní hmotnost": "HmotnostiProvozni",
+    "Největší povolená hmotnost": "HmotnostiPripPov",
+    "Rozvor": "RozmeryRozvor",
+    "Status": "StatusNazev",
+}
+
+
+def _column_key(label):
+    """Reduce a column label to lower-case ASCII letters and digits.
+
+    The API field names are the Czech labels without diacritics, so
+    "Pravidelná technická prohlídka do [datum]" and
+    "PravidelnaTechnickaProhlidkaDo" give the same key.
+    """
+    label = re.sub(r"\[.*?\]", "", label)
+    label = unicodedata.normalize("NFKD", label).encode("ascii", "ignore").decode()
+    return re.sub(r"[^0-9a-z]", "", label.lower())
+
+
+_COLUMN_KEYS = {
+    **{_column_key(raw_field): raw_field for raw_field, _, _ in FIELD_MAP},
+    **{_column_key(label): raw_field for label, raw_field in COLUMN_ALIASES.items()},
+}
+
+
+def map_columns(header):
+    """Return [(column index, raw API field)] for the recognised columns."""
+    columns = []
+    for index, label in enumerate(header):
+        raw_field = _COLUMN_KEYS.get(_column_key(label))
+        if raw_field is not None:
+            columns.append((index, raw_field))
+    if not any(raw_field == "VIN" for _, raw_field in columns):
+        raise ValueError("The export has no VIN column")
+    return columns
+
+
+def encode_record(record):
+    """Return the compact JSON form of a record."""
+    values = list(_RECORD_VALUES(record))
+    for position in _DATE_POSITIONS:
+        if values[position] is not None:
+            values[position] = values[position].isoformat()
+    return _ENCODER.encode(values)
+
+
+def decode_record(payload):
+    """Build a record from encode_record() output."""
+    values = json.loads(payload)
+    for position in _DATE_POSITIONS:
+        if values[position]:
+            values[position] = date.fromisoformat(values[position])
+    return VehicleRecord(*values)
+
+
+def normalize_row(row, columns):
+    """Return (vin, valid_until, record JSON) of a CSV row, None without a VIN."""
+    raw = {raw_field: row[index] for index, raw_field in columns if index < len(row)}
+    record = parse_vehicle_data(raw)
+    vin = record.vin.strip().upper()
+    if not vin:
+        return None
+    return (
+        vin,
+        record.valid_until.isoformat() if record.valid_until else None,
+        encode_record(record),
+    )
+
+
+def _sniff_delimiter(header_line):
+    """Return ";" for semicolon separated exports, "," otherwise."""
+    return ";" if header_line.count(";") > header_line.count(",") else ","
+
+
+def split_export(csv_path, chunk_size=REGISTRY_CHUNK_SIZE):
+    """Return the header line and [(start, end)] byte ranges of whole records.
+
+    A newline only ends a record outside a quoted field, i.e. after an even
+    number of quote characters; counting them is a C-speed scan of the file,
+    far cheaper than parsing it.
+    """
+    ranges = []
+    with open(csv_path, "rb") as export:
+        header = export.readline()
+        start = position = len(header)
+        target = start + chunk_size
+        in_quotes = 0
+        while block := export.read(_SCAN_BLOCK_SIZE):
+            offset = 0
+            while position + len(block) > target:
+                cut = max(offset, target - position)
+                in_quotes ^= block.count(b'"', offset, cut) & 1
+                offset = cut
+                while (newline := block.find(b"\n", offset)) >= 0:
+                    in_quotes ^= block.count(b'"', offset, newline) & 1
+                    offset = newline + 1
+                    if not in_quotes:
+                        break
+                else:
+                    # The record goes on in the next block
+                    target = position + len(block)
+                    break
+                ranges.append((start, position + offset))
+                start = position + offset
+                target = start + chunk_size
+            in_quotes ^= block.count(b'"', offset) & 1
+            position += len(block)
+    if position > start:
+        ranges.append((start, position))
+    if header.startswith(b"\xef\xbb\xbf"):
+        header = header[3:]
+    return header, ranges
+
+
+def _read_lines(export, length):
+    """Yield the lines of the next `length` bytes of a binary file."""
+    for line in export:
+        yield line
+        length -= len(line)
+        if length <= 0:
+            return
+
+
+def normalize_range(csv_path, start, end, columns, delimiter, encoding, run_path):
+    """Normalize the records in [start, end) into a run file sorted by VIN.
+
+    Runs in a worker process; returns (rows, skipped).
+    """
+    rows = []
+    skipped = 0
+    with open(csv_path, "rb") as export:
+        export.seek(start)
+        lines = (line.decode(encoding, "replace") for line in _read_lines(export, end - start))
+        for row in csv.reader(lines, delimiter=delimiter):
+            normalized = normalize_row(row, columns) if row else None
+            if normalized is None:
+                skipped += 1
+                continue
+            vin, valid_until, record = normalized
+            rows.append((vin, valid_until or "", record))
+    # Stable, so rows of a VIN with the same validity keep the file order
+    rows.sort(key=_RUN_KEY)
+    with open(run_path, "w", encoding="utf-8") as run:
+        run.writelines(f"{vin}\t{valid_until}\t{record}\n" for vin, valid_until, record in rows)
+    return len(rows), skipped
+
+
+def _read_run(run_path):
+    """Yield the (vin, valid_until, record) rows of a run file."""
+    with open(run_path, encoding="utf-8") as run:
+        for line in run:
+            yield tuple(line.rstrip("\n").split("\t", 2))
+
+
+def _latest_per_vin(rows):
+    """Yield one row per VIN from rows sorted by (VIN, valid_until).
+
+    The last row of a VIN wins: the one with the latest STK validity and,
+    among equal ones, the one listed last in the export.
+    """
+    previous = None
+    for row in rows:
+        if previous is not None and previous[0] != row[0]:
+            yield previous[0], previous[1] or None, previous[2]
+        previous = row
+    if previous is not None:
+        yield previous[0], previous[1] or None, previous[2]
+
+
+def build_registry(
+    csv_path,
+    database_path,
+    exported_at=None,
+    encoding="utf-8",
+    workers=REGISTRY_WORKERS,
+    chunk_size=REGISTRY_CHUNK_SIZE,
+    progress=None,
+    mp_context=None,
+):
+    """Import a registry export into a new index; blocking, return the statistics.
+
+    The export is split into byte ranges of whole records, which worker
+    processes normalize into runs sorted by VIN; the runs are then merged
+    into the index in key order. With one worker the ranges are normalized
+    in the calling thread. The index is written next to `database_path` and
+    moved over it when complete, so lookups keep using the previous index
+    meanwhile. `progress(bytes_done, total_bytes, rows)` is called whenever
+    a range is done.
+    """
+    started = time.monotonic()
+    if exported_at is None:
+        exported_at = datetime.fromtimestamp(os.path.getmtime(csv_path), timezone.utc)
+    header, ranges = split_export(csv_path, chunk_size)
+    header = header.decode(encoding)
+    delimiter = _sniff_delimiter(header)
+    columns = map_columns(next(csv.reader([header], delimiter=delimiter)))
+    total_bytes = sum(end - start for start, end in ranges)
+
+    temporary_path = f"{database_path}.tmp"
+    if os.path.exists(temporary_path):
+        os.remove(temporary_path)
+    run_directory = tempfile.mkdtemp(prefix="stk_czechr_runs_", dir=os.path.dirname(database_path))
+    run_paths = [os.path.join(run_directory, f"{index}.run") for index in range(len(ranges))]
+    jobs = [
+        (csv_path, start, end, columns, delimiter, encoding, run_path)
+        for (start, end), run_path in zip(ranges, run_paths)
+    ]
+    connection = sqlite3.connect(temporary_path)
+    rows = skipped = bytes_done = 0
+    try:
+        if workers > 1 and len(jobs) > 1:
+            # Spawned rather than forked: forking the threads of Home
+            # Assistant's process is unsafe
+            with ProcessPoolExecutor(
+                min(workers, len(jobs)),
+                mp_context or multiprocessing.get_context("spawn"),
+                initializer=runpy.run_path,
+                initargs=_WORKER_STARTUP,
+            ) as executor:
+                futures = {executor.submit(normalize_range, *job): job for job in jobs}
+                for future in as_completed(futures):
+                    job_rows, job_skipped = future.result()
+                    rows += job_rows
+                    skipped += job_skipped
+                    bytes_done += futures[future][2] - futures[future][1]
+                    if progress is not None:
+                        progress(bytes_done, total_bytes, rows)
+        else:
+            for job in jobs:
+                job_rows, job_skipped = normalize_range(*job)
+                rows += job_rows
+                skipped += job_skipped
+                bytes_done += job[2] - job[1]
+                if progress is not None:
+                    progress(bytes_done, total_bytes, rows)
+        normalized = time.monotonic()
+
+        # The file is only moved into place once complete, so no journal
+        connection.execute("PRAGMA journal_mode=OFF")
+        connection.execute("PRAGMA synchronous=OFF")
+        for statement in SCHEMA:
+            connection.execute(statement)
+        # Rows arrive in VIN order, so the B-tree is only ever appended to
+        merged = heapq.merge(*(_read_run(run_path) for run_path in run_paths), key=_RUN_KEY)
+        connection.executemany(
+            "INSERT INTO vehicles (vin, valid_until, record) VALUES (?, ?, ?)",
+            _latest_per_vin(merged),
+        )
+        vehicles = connection.execute("SELECT count(*) FROM vehicles").fetchone()[0]
+        stats = {
+            "source": os.path.basename(csv_path),
+            "exported_at": exported_at.isoformat(),
+            "imported_at": datetime.now(timezone.utc).isoformat(),
+            "rows": rows,
+            "vehicles": vehicles,
+            "skipped": skipped,
+        }
+        connection.executemany(
+            "INSERT INTO metadata (key, value) VALUES (?, ?)",
+            [(key, str(value)) for key, value in stats.items()],
+        )
+        connection.commit()
+    except BaseException:
+        connection.close()
+        os.remove(temporary_path)
+        raise
+    finally:
+        shutil.rmtree(run_directory, ignore_errors=True)
+    connection.close()
+    os.replace(temporary_path, database_path)
+
+    elapsed = time.monotonic() - started
+    stats["chunks"] = len(ranges)
+    stats["normalize_seconds"] = round(normalized - started, 1)
+    stats["merge_seconds"] = round(elapsed - (normalized - started), 1)
+    stats["elapsed"] = round(elapsed, 1)
+    stats["rows_per_second"] = round(rows / elapsed) if elapsed else rows
+    stats["megabytes_per_second"] = round(total_bytes / 2**20 / elapsed, 1) if elapsed else 0
+    return stats
+
+
+class RegistryDatabase:
+    """Read-only access to the VIN index; call from the executor."""
+
+    def __init__(self, path):
+        """Open the index, if one has been imported."""
+        self.path = path
+        self.metadata = {}
+        self._connection = None
+        self._lock = threading.Lock()
+        self.open()
+
+    def open(self):
+        """(Re)open the index, e.g. after a new import replaced it."""
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+            self.metadata = {}
+            if not os.path.exists(self.path):
+                return
+            # The path is percent-encoded, so "?", "#" or "%" in it are not
+            # taken for URI syntax
+            uri = f"{Path(self.path).absolute().as_uri()}?mode=ro"
+            try:
+                self._connection = sqlite3.connect(uri, uri=True, check_same_thread=False)
+                self.metadata = dict(self._connection.execute("SELECT key, value FROM metadata"))
+            except sqlite3.Error as err:
+                # The index is optional; a new import replaces a broken file
+                _LOGGER.error(
+                    "Cannot open %s, the offline VIN index is disabled: %s", self.path, err
+                )
+                if self._connection is not None:
+                    self._connection.close()
+                    self._connection = None
+                self.metadata = {}
+
+    def lookup(self, vin):
+        """Return the record of a VIN, None when it is not in the index."""
+        with self._lock:
+            if self._connection is None:
+                return None
+            row = self._connection.execute(
+                "SELECT record FROM vehicles WHERE vin = ?", (vin,)
+            ).fetchone()
+        return decode_record(row[0]) if row else None
+
+    def close(self):
+        """Close the index."""
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+
+class STKRegistry:
+    """Non-blocking wrapper running every index call in the executor."""
+
+    def __init__(self, hass, database):
+        """Initialize."""
+        self.hass = hass
+        self._database = database
+        self._importing = False
+        self.progress = None  # Progress of the running import, for diagnostics
+
+    @property
+    def metadata(self):
+        """Return the statistics of the imported export."""
+        return self._database.metadata
+
+    @property
+    def exported_at(self):
+        """Return when the imported export was current, None without an index."""
+        exported_at = self._database.metadata.get("exported_at")
+        return datetime.fromisoformat(exported_at) if exported_at else None
+
+    async def async_lookup(self, vin):
+        """Return the record of a VIN from the index."""
+        if not self._database.metadata:
+            return None
+        try:
+            return await self.hass.async_add_executor_job(self._database.lookup, vin)
+        except sqlite3.Error as err:
+            _LOGGER.error("Could not read VIN %s from the registry index: %s", vin, err)
+            return None
+
+    @property
+    def importing(self):
+        """Return True while an export is being imported."""
+        return self._importing
+
+    async def async_import(self, csv_path, exported_at=None, encoding="utf-8"):
+        """Replace the index with a new export; return the import statistics.
+
+        The workers run in separate processes and the merge in the executor,
+        so the event loop stays free for the whole import.
+        """
+        self._importing = True
+        started = time.monotonic()
+        logged_percent = 0
+
+        def _progress(bytes_done, total_bytes, rows):
+            # Called from the executor thread
+            nonlocal logged_percent
+            elapsed = time.monotonic() - started
+            self.progress = {
+                "percent": round(bytes_done / total_bytes * 100, 1),
+                "rows": rows,
+                "rows_per_second": round(rows / elapsed) if elapsed else rows,
+                "megabytes_per_second": round(bytes_done / 2**20 / elapsed, 1) if elapsed else 0,
+            }
+            if self.progress["percent"] - logged_percent >= 10:
+                logged_percent = self.progress["percent"]
+                _LOGGER.info(
+                    "Registry import %.0f %%: %s rows, %s rows/s",
+                    self.progress["percent"], rows, self.progress["rows_per_second"],
+                )
+
+        try:
+            stats = await self.hass.async_add_executor_job(
+                lambda: build_registry(
+                    csv_path, self._database.path, exported_at, encoding, progress=_progress
+                )
+            )
+            await self.hass.async_add_executor_job(self._database.open)
+        finally:
+            self._importing = False
+            self.progress = None
+        _LOGGER.info(
+            "Imported %s vehicles from %s in %s s", stats["vehicles"], csv_path, stats["elapsed"]
+        )
+        return stats
+
+    async def async_close(self):
+        """Close the index."""
+        await self.hass.async_add_executor_job(self._database.close)
+
+
+def async_get_registry(hass):
+    """Return the registry index, or None when the integration has not been set up."""
+    return hass.data.get(DOMAIN, {}).get(DATA_REGISTRY)
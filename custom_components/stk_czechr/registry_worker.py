@@ -0,0 +1,26 @@
+"""Start-up of the registry import worker processes.
+
+build_registry() runs this file with runpy.run_path() as the process pool
+initializer, before a spawned worker unpickles its first job. Jobs refer to
+registry.normalize_range by its full module name, and importing that the
+regular way would first run the package __init__, i.e. load Home
+Assistant, aiohttp and the whole integration in every worker. The package
+and its parents are registered here without running any __init__, so a
+worker only imports registry, const, models and parser, which need only
+the standard library. This also makes the package importable although
+Home Assistant takes the configuration directory off sys.path.
+"""
+import os
+import sys
+import types
+
+_PACKAGE = __name__.rpartition(".")[0]
+_path = os.path.dirname(os.path.abspath(__file__))
+_name = _PACKAGE
+
+while _name and _name not in sys.modules:
+    _module = types.ModuleType(_name)
+    _module.__path__ = [_path]
+    sys.modules[_name] = _module
+    _name = _name.rpartition(".")[0]
+    _path = os.path.dirname(_path)
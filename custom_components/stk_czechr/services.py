@@ -0,0 +1,372 @@
+"""Services for the STK czechr integration."""
+import asyncio
+import csv
+import io
+from itertools import chain
+import logging
+import sqlite3
+
+import voluptuous as vol
+
+from homeassistant.config_entries import SOURCE_IMPORT
+from homeassistant.core import HomeAssistant, ServiceCall, SupportsResponse
+from homeassistant.data_entry_flow import FlowResultType
+from homeassistant.exceptions import HomeAssistantError
+import homeassistant.helpers.config_validation as cv
+from homeassistant.helpers import device_registry as dr, entity_registry as er
+from homeassistant.helpers.service import async_extract_referenced_entity_ids
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    DOMAIN,
+    CONF_NAME,
+    CONF_VIN,
+    CONF_API_KEY,
+    SERVICE_IMPORT_VEHICLES,
+    ATTR_CSV,
+    ATTR_PATH,
+    ATTR_VEHICLES,
+    ATTR_STRICT_CHECK_DIGIT,
+    SERVICE_QUERY_HISTORY,
+    ATTR_FIELD,
+    ATTR_SINCE,
+    ATTR_UNTIL,
+    ATTR_VALID_FROM,
+    ATTR_VALID_TO,
+    ATTR_RENEWALS,
+    ATTR_LIMIT,
+    HISTORY_TRACKED_FIELDS,
+    SERVICE_REFRESH,
+    ATTR_VINS,
+    SERVICE_IMPORT_REGISTRY,
+    ATTR_EXPORTED_AT,
+    ATTR_ENCODING,
+)
+from .coordinator import async_get_fleet_coordinator, async_get_vehicle_coordinators
+from .history import async_get_history
+from .models import VehicleRecord
+from .registry import async_get_registry
+from .util import normalize_vin, validate_vin, vin_check_digit_valid
+
+_LOGGER = logging.getLogger(__name__)
+
+IMPORT_VEHICLES_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_CSV): cv.string,
+        vol.Optional(ATTR_PATH): cv.string,
+        vol.Optional(ATTR_VEHICLES): vol.All(
+            cv.ensure_list,
+            [
+                vol.Schema(
+                    {
+                        vol.Required(CONF_VIN): cv.string,
+                        vol.Optional(CONF_NAME): cv.string,
+                        vol.Optional(CONF_API_KEY): cv.string,
+                    }
+                )
+            ],
+        ),
+        vol.Optional(CONF_API_KEY): cv.string,
+        vol.Optional(ATTR_STRICT_CHECK_DIGIT, default=False): cv.boolean,
+    }
+)
+
+QUERY_HISTORY_SCHEMA = vol.Schema(
+    {
+        vol.Optional(CONF_VIN): vol.All(cv.string, normalize_vin),
+        vol.Optional(ATTR_FIELD): vol.In(HISTORY_TRACKED_FIELDS),
+        vol.Optional(ATTR_SINCE): cv.datetime,
+        vol.Optional(ATTR_UNTIL): cv.datetime,
+        vol.Optional(ATTR_VALID_FROM): cv.date,
+        vol.Optional(ATTR_VALID_TO): cv.date,
+        vol.Optional(ATTR_RENEWALS, default=False): cv.boolean,
+        vol.Optional(ATTR_LIMIT, default=1000): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=100_000)
+        ),
+    }
+)
+
+REFRESH_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_VINS): vol.All(cv.ensure_list, [vol.All(cv.string, normalize_vin)]),
+        **cv.ENTITY_SERVICE_FIELDS,
+    }
+)
+
+IMPORT_REGISTRY_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_PATH): cv.string,
+        vol.Optional(ATTR_EXPORTED_AT): cv.datetime,
+        vol.Optional(ATTR_ENCODING, default="utf-8"): cv.string,
+    }
+)
+
+
+def _iter_csv_rows(lines):
+    """Yield vehicle dicts from CSV lines of `name,vin[,api_key]`.
+
+    A header row is recognised by a "vin" column; without one the columns are
+    taken positionally. Rows are produced one at a time, so the file is never
+    loaded whole.
+    """
+    reader = csv.reader(lines)
+    columns = None
+    for row in reader:
+        row = [cell.strip() for cell in row]
+        if not any(row) or row[0].startswith("#"):
+            continue
+        if columns is None:
+            lowered = [cell.lower() for cell in row]
+            if CONF_VIN in lowered:
+                columns = lowered
+                continue
+            columns = [CONF_NAME, CONF_VIN, CONF_API_KEY]
+        yield {column: value for column, value in zip(columns, row) if value}
+
+
+def _iter_csv_file(path):
+    """Yield vehicles from a CSV file, reading it line by line."""
+    with open(path, encoding="utf-8-sig", newline="") as csv_file:
+        yield from _iter_csv_rows(csv_file)
+
+
+def validate_vehicle_batch(vehicles, configured_vins, default_api_key="", strict_check_digit=False):
+    """Validate a batch of vehicles against the set of configured VINs.
+
+    Returns (accepted, report). `vehicles` is consumed once, so it may be a
+    generator over a file. Duplicates, both against configured vehicles and
+    within the batch, are found through a set lookup.
+    """
+    seen = set(configured_vins)
+    accepted = []
+    report = {"duplicate": [], "invalid": [], "check_digit_mismatch": []}
+
+    for vehicle in vehicles:
+        vin = normalize_vin(vehicle.get(CONF_VIN))
+        api_key = vehicle.get(CONF_API_KEY) or default_api_key
+        if not validate_vin(vin) or not api_key:
+            report["invalid"].append(vin or vehicle.get(CONF_VIN, ""))
+            continue
+        if vin in seen:
+            report["duplicate"].append(vin)
+            continue
+        if not vin_check_digit_valid(vin):
+            report["check_digit_mismatch"].append(vin)
+            if strict_check_digit:
+                continue
+        seen.add(vin)
+        accepted.append(
+            {CONF_NAME: vehicle.get(CONF_NAME) or vin, CONF_VIN: vin, CONF_API_KEY: api_key}
+        )
+
+    return accepted, report
+
+
+async def _async_import_vehicles(hass: HomeAssistant, call: ServiceCall):
+    """Create config entries for a batch of vehicles."""
+    sources = [call.data.get(ATTR_VEHICLES, [])]
+    if ATTR_CSV in call.data:
+        sources.append(_iter_csv_rows(io.StringIO(call.data[ATTR_CSV])))
+    if ATTR_PATH in call.data:
+        path = call.data[ATTR_PATH]
+        if not hass.config.is_allowed_path(path):
+            raise HomeAssistantError(f"Access to {path} is not allowed")
+        sources.append(_iter_csv_file(path))
+
+    configured_vins = {
+        normalize_vin(entry.data.get(CONF_VIN))
+        for entry in hass.config_entries.async_entries(DOMAIN)
+    }
+    # The file is read row by row while validating, in the executor; only
+    # the accepted vehicles are kept
+    accepted, report = await hass.async_add_executor_job(
+        validate_vehicle_batch,
+        chain.from_iterable(sources),
+        configured_vins,
+        call.data.get(CONF_API_KEY, ""),
+        call.data[ATTR_STRICT_CHECK_DIGIT],
+    )
+
+    # Each new entry joins its fleet scheduler, so the initial fetches are
+    # queued on the shared rate limiter instead of all hitting the API at once
+    imported = []
+    report["aborted"] = []
+    for vehicle in accepted:
+        result = await hass.config_entries.flow.async_init(
+            DOMAIN, context={"source": SOURCE_IMPORT}, data=vehicle
+        )
+        if result["type"] == FlowResultType.CREATE_ENTRY:
+            imported.append(vehicle[CONF_VIN])
+        else:
+            _LOGGER.debug("Import of %s aborted: %s", vehicle[CONF_VIN], result.get("reason"))
+            report["aborted"].append(vehicle[CONF_VIN])
+
+    _LOGGER.info(
+        "Imported %s vehicles (%s duplicate, %s invalid, %s aborted)",
+        len(imported),
+        len(report["duplicate"]),
+        len(report["invalid"]),
+        len(report["aborted"]),
+    )
+    return {"imported": imported, **report}
+
+
+async def _async_query_history(hass: HomeAssistant, call: ServiceCall):
+    """Return stored changes for fleet reporting."""
+    history = async_get_history(hass)
+    if history is None:
+        raise HomeAssistantError("The history database is not available")
+    query = {
+        key: value
+        for key, value in (
+            ("vin", call.data.get(CONF_VIN)),
+            ("field", call.data.get(ATTR_FIELD)),
+            ("since", _as_aware(call.data.get(ATTR_SINCE))),
+            ("until", _as_aware(call.data.get(ATTR_UNTIL))),
+            ("valid_from", call.data.get(ATTR_VALID_FROM)),
+            ("valid_to", call.data.get(ATTR_VALID_TO)),
+        )
+        if value is not None
+    }
+    changes = await history.async_query(
+        **query, renewals=call.data[ATTR_RENEWALS], limit=call.data[ATTR_LIMIT]
+    )
+    return {"count": len(changes), "changes": changes}
+
+
+def _referenced_vins(hass: HomeAssistant, call: ServiceCall):
+    """Return the VINs given directly or through device, entity and area targets."""
+    vins = set(call.data.get(ATTR_VINS, []))
+    selected = async_extract_referenced_entity_ids(hass, call)
+    device_ids = set(selected.referenced_devices)
+    entity_registry = er.async_get(hass)
+    for entity_id in selected.referenced:
+        entity = entity_registry.async_get(entity_id)
+        if entity is not None and entity.platform == DOMAIN and entity.device_id:
+            device_ids.add(entity.device_id)
+    device_registry = dr.async_get(hass)
+    for device_id in device_ids:
+        device = device_registry.async_get(device_id)
+        if device is not None:
+            vins.update(vin for domain, vin in device.identifiers if domain == DOMAIN)
+    return vins
+
+
+async def _async_refresh(hass: HomeAssistant, call: ServiceCall):
+    """Fetch the selected vehicles now and return once their data has landed."""
+    vins = _referenced_vins(hass, call)
+    if not vins:
+        raise HomeAssistantError("No STK czechr vehicle selected")
+    coordinators = [
+        coordinator
+        for vin in sorted(vins)
+        for coordinator in async_get_vehicle_coordinators(hass, vin)
+    ]
+    # Every request queues on the priority lane of its key's limiter, so
+    # they are sent one token at a time ahead of the routine polls
+    errors = await asyncio.gather(
+        *(
+            async_get_fleet_coordinator(hass, coordinator.api_key).async_refresh_now(coordinator)
+            for coordinator in coordinators
+        )
+    )
+    vehicles = []
+    for coordinator, error in zip(coordinators, errors):
+        record = coordinator.data if isinstance(coordinator.data, VehicleRecord) else None
+        vehicles.append(
+            {
+                "vin": coordinator.vin,
+                "name": coordinator.name,
+                "valid_until": record.valid_until.isoformat()
+                if record and record.valid_until else None,
+                "last_fetch": coordinator.last_fetch.isoformat() if coordinator.last_fetch else None,
+                "error": error,
+            }
+        )
+    found = {coordinator.vin for coordinator in coordinators}
+    _LOGGER.debug("Refreshed %s vehicles on request", len(vehicles))
+    return {"vehicles": vehicles, "not_found": sorted(vins - found)}
+
+
+async def _async_import_registry(hass: HomeAssistant, call: ServiceCall):
+    """Build the offline VIN index from an open-data registry export."""
+    registry = async_get_registry(hass)
+    if registry is None:
+        raise HomeAssistantError("The registry index is not available")
+    if registry.importing:
+        raise HomeAssistantError("A registry import is already running")
+    path = call.data[ATTR_PATH]
+    if not hass.config.is_allowed_path(path):
+        raise HomeAssistantError(f"Access to {path} is not allowed")
+    try:
+        stats = await registry.async_import(
+            path, _as_aware(call.data.get(ATTR_EXPORTED_AT)), call.data[ATTR_ENCODING]
+        )
+    except (OSError, LookupError, ValueError, sqlite3.Error) as err:
+        raise HomeAssistantError(f"Could not import {path}: {err}") from err
+
+    # Vehicles whose data predates the new export start from the index
+    restored = 0
+    for coordinator in async_get_vehicle_coordinators(hass):
+        fleet = async_get_fleet_coordinator(hass, coordinator.api_key)
+        if fleet.is_refreshing(coordinator):
+            continue
+        if await coordinator.async_restore_registry():
+            fleet.async_schedule(coordinator, coordinator.next_refresh_delay())
+            restored += 1
+    return {**stats, "restored": restored}
+
+
+def _as_aware(value):
+    """Interpret naive datetimes from the service call in local time."""
+    if value is None or value.tzinfo is not None:
+        return value
+    return value.replace(tzinfo=dt_util.DEFAULT_TIME_ZONE)
+
+
+def async_setup_services(hass: HomeAssistant):
+    """Register the integration services."""
+
+    async def async_import_vehicles(call: ServiceCall):
+        return await _async_import_vehicles(hass, call)
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_IMPORT_VEHICLES,
+        async_import_vehicles,
+        schema=IMPORT_VEHICLES_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+
+    async def async_query_history(call: ServiceCall):
+        return await _async_query_history(hass, call)
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_QUERY_HISTORY,
+        async_query_history,
+        schema=QUERY_HISTORY_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
+
+    async def async_refresh(call: ServiceCall):
+        return await _async_refresh(hass, call)
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_REFRESH,
+        async_refresh,
+        schema=REFRESH_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+
+    async def async_import_registry(call: ServiceCall):
+        return await _async_import_registry(hass, call)
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_IMPORT_REGISTRY,
+        async_import_registry,
+        schema=IMPORT_REGISTRY_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
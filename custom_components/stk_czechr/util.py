@@ -0,0 +1,100 @@
+"""Helpers for deriving STK state from the expiry date."""
+from datetime import date, timedelta
+
+from homeassistant.util import dt as dt_util
+
+from .const import STATUS_WARNING_DAYS, STKStatus
+
+
+def parse_date(value):
+    """Return a date from a YYYY-MM-DD string (or a date), None if invalid."""
+    if not value:
+        return None
+    if isinstance(value, date):
+        return value
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        return None
+
+
+def days_until_expiry(valid_until, today=None):
+    """Return signed days until expiry (negative once expired)."""
+    expiry_date = parse_date(valid_until)
+    if expiry_date is None:
+        return None
+    return (expiry_date - (today or dt_util.now().date())).days
+
+
+def calculate_days_remaining(valid_until, today=None):
+    """Calculate days remaining until expiration."""
+    days = days_until_expiry(valid_until, today)
+    if days is None:
+        return None
+    return max(0, days)
+
+
+def determine_status(valid_until, today=None):
+    """Determine the status based on valid_until date."""
+    days_remaining = calculate_days_remaining(valid_until, today)
+    if days_remaining is None:
+        return STKStatus.UNKNOWN
+    elif days_remaining <= 0:
+        return STKStatus.EXPIRED
+    elif days_remaining <= STATUS_WARNING_DAYS:
+        return STKStatus.WARNING
+    return STKStatus.VALID
+
+
+def status_changes(valid_until):
+    """Return [(local start of day, status)] for the days the STK status changes.
+
+    Mirrors determine_status(): "warning" from STATUS_WARNING_DAYS days before
+    the expiry date, "expired" from the expiry date itself.
+    """
+    expiry_date = parse_date(valid_until)
+    if expiry_date is None:
+        return []
+    return [
+        (
+            dt_util.start_of_local_day(expiry_date - timedelta(days=STATUS_WARNING_DAYS)),
+            STKStatus.WARNING,
+        ),
+        (dt_util.start_of_local_day(expiry_date), STKStatus.EXPIRED),
+    ]
+
+
+# ISO 3779 transliteration and position weights for the VIN check digit
+_VIN_VALUES = {
+    **{str(digit): digit for digit in range(10)},
+    **dict(zip("ABCDEFGH", range(1, 9))),
+    **dict(zip("JKLMN", range(1, 6))),
+    "P": 7,
+    "R": 9,
+    **dict(zip("STUVWXYZ", range(2, 10))),
+}
+_VIN_WEIGHTS = (8, 7, 6, 5, 4, 3, 2, 10, 0, 9, 8, 7, 6, 5, 4, 3, 2)
+
+
+def normalize_vin(vin):
+    """Return the VIN in upper case without surrounding whitespace."""
+    return (vin or "").strip().upper()
+
+
+def validate_vin(vin):
+    """Validate the VIN: 17 characters, letters I, O and Q are not allowed."""
+    return len(vin) == 17 and all(char in _VIN_VALUES for char in vin.upper())
+
+
+def vin_check_digit_valid(vin):
+    """Return True when the 9th character matches the computed check digit.
+
+    The check digit is mandatory only for North American VINs; European
+    manufacturers often use the position freely, so callers decide whether
+    a mismatch is an error.
+    """
+    vin = vin.upper()
+    if not validate_vin(vin):
+        return False
+    remainder = sum(_VIN_VALUES[char] * weight for char, weight in zip(vin, _VIN_WEIGHTS)) % 11
+    return vin[8] == ("X" if remainder == 10 else str(remainder))
@@ -0,0 +1 @@
+"""Tests for the STK czechr integration."""
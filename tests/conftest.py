@@ -0,0 +1,47 @@
+"""Shared fixtures of the integration tests."""
+import asyncio
+import selectors
+
+import pytest
+
+
+class _VirtualTimeSelector:
+    """Selector that jumps the loop clock forward instead of blocking."""
+
+    def __init__(self, loop):
+        self._loop = loop
+        self._selector = selectors.DefaultSelector()
+
+    def select(self, timeout=None):
+        events = self._selector.select(0)
+        if not events and timeout:
+            self._loop.now += timeout
+        return events
+
+    def __getattr__(self, name):
+        return getattr(self._selector, name)
+
+
+class VirtualTimeLoop(asyncio.SelectorEventLoop):
+    """Event loop whose clock only advances while every task sleeps.
+
+    Timers fire in order without real waiting, so the rate limiter can be
+    tested against its configured rate in milliseconds.
+    """
+
+    def __init__(self):
+        self.now = 0.0
+        super().__init__(_VirtualTimeSelector(self))
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def loop():
+    """Return an event loop running on virtual time."""
+    loop = VirtualTimeLoop()
+    asyncio.set_event_loop(loop)
+    yield loop
+    asyncio.set_event_loop(None)
+    loop.close()
@@ -0,0 +1,52 @@
+"""Tests of the fleet expiry index."""
+from datetime import date, timedelta
+
+from custom_components.stk_czechr.const import STKStatus
+from custom_components.stk_czechr.expiry_index import ExpiryIndex
+
+TODAY = date(2026, 10, 17)
+
+
+def test_counts_and_upcoming():
+    """Vehicles are counted per status and listed by expiry date."""
+    index = ExpiryIndex()
+    index.update("expired", TODAY, "VIN1", "Expired")
+    index.update("warning", TODAY + timedelta(days=10), "VIN2", "Warning")
+    index.update("valid", TODAY + timedelta(days=200), "VIN3", "Valid")
+    index.update("unknown", None, "VIN4", "Unknown")
+
+    assert index.counts(TODAY) == {
+        STKStatus.EXPIRED: 1,
+        STKStatus.WARNING: 1,
+        STKStatus.VALID: 1,
+        STKStatus.UNKNOWN: 1,
+    }
+    assert index.upcoming(TODAY) == [
+        (TODAY + timedelta(days=10), "warning"),
+        (TODAY + timedelta(days=200), "valid"),
+    ]
+
+
+def test_renewal_moves_the_vehicle():
+    """Updating an entry replaces its previous expiry date."""
+    index = ExpiryIndex()
+    index.update("entry", TODAY + timedelta(days=5), "VIN1")
+    assert index.update("entry", TODAY + timedelta(days=5), "VIN1") is False
+    assert index.update("entry", TODAY + timedelta(days=400), "VIN1") is True
+
+    assert len(index) == 1
+    assert index.counts(TODAY)[STKStatus.VALID] == 1
+    assert index.upcoming(TODAY) == [(TODAY + timedelta(days=400), "entry")]
+
+
+def test_entries_with_the_same_vin_are_independent():
+    """Removing one of two entries tracking a VIN keeps the other indexed."""
+    index = ExpiryIndex()
+    valid_until = TODAY + timedelta(days=20)
+    index.update("first", valid_until, "TMBJJ7NE0J0123456", "Octavia")
+    index.update("second", valid_until, "TMBJJ7NE0J0123456", "Octavia (work)")
+
+    assert index.remove("first") is True
+    assert index.counts(TODAY)[STKStatus.WARNING] == 1
+    assert index.upcoming(TODAY) == [(valid_until, "second")]
+    assert index.vehicles == {"second": ("TMBJJ7NE0J0123456", "Octavia (work)")}
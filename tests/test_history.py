@@ -0,0 +1,149 @@
+"""Tests of the inspection and registration history."""
+from dataclasses import replace
+from datetime import date, datetime, timedelta, timezone
+import sqlite3
+from types import SimpleNamespace
+
+import pytest
+
+from custom_components.stk_czechr.history import HistoryDatabase, STKHistory
+from custom_components.stk_czechr.models import VehicleRecord
+
+VIN = "TMBJJ7NE0J0123456"
+OTHER_VIN = "TMBJG7NE5F0654321"
+START = datetime(2026, 1, 1, 8, 0, tzinfo=timezone.utc)
+
+RECORD = VehicleRecord(valid_until=date(2026, 3, 31), vin=VIN, owners_count=1, orv_number="UAA123456")
+RENEWED = VehicleRecord(valid_until=date(2028, 3, 31), vin=VIN, owners_count=1, orv_number="UAA123456")
+
+
+@pytest.fixture
+def database():
+    """Return an in-memory history database."""
+    database = HistoryDatabase(":memory:")
+    yield database
+    database.close()
+
+
+def test_first_record_is_a_baseline(database):
+    """Every tracked field is stored once, without an old value."""
+    assert database.record_changes(VIN, None, RECORD, START) == 6
+
+    rows = {row["field"]: row for row in database.query(vin=VIN)}
+    assert rows["valid_until"] == {
+        "vin": VIN,
+        "field": "valid_until",
+        "old_value": None,
+        "new_value": "2026-03-31",
+        "valid_until": "2026-03-31",
+        "changed_at": "2026-01-01T08:00:00.000000Z",
+    }
+    assert rows["owners_count"]["new_value"] == "1"
+    assert all(row["old_value"] is None for row in rows.values())
+
+
+def test_unchanged_fields_are_skipped(database):
+    """Only the fields that differ get a row."""
+    database.record_changes(VIN, None, RECORD, START)
+    assert database.record_changes(VIN, RECORD, RECORD, START + timedelta(days=1)) == 0
+
+    sold = replace(RENEWED, owners_count=2)
+    assert database.record_changes(VIN, RECORD, sold, START + timedelta(days=2)) == 2
+    changes = database.query(vin=VIN, since=START + timedelta(days=1))
+    assert [(row["field"], row["old_value"], row["new_value"]) for row in changes] == [
+        ("valid_until", "2026-03-31", "2028-03-31"),
+        ("owners_count", "1", "2"),
+    ]
+
+
+def test_renewals_filter(database):
+    """Renewals are valid_until changes to a later date, never a baseline."""
+    database.record_changes(VIN, None, RECORD, START)
+    database.record_changes(OTHER_VIN, None, VehicleRecord(valid_until=date(2027, 5, 1)), START)
+    database.record_changes(VIN, RECORD, RENEWED, START + timedelta(days=60))
+    # A correction to an earlier date is not a renewal
+    database.record_changes(VIN, RENEWED, RECORD, START + timedelta(days=61))
+
+    renewals = database.query(renewals=True)
+    assert [(row["vin"], row["old_value"], row["new_value"]) for row in renewals] == [
+        (VIN, "2026-03-31", "2028-03-31")
+    ]
+    # The field filter cannot widen a renewals query
+    assert database.query(renewals=True, field="owners_count") == renewals
+
+
+def test_time_and_valid_until_bounds(database):
+    """`since` is inclusive, `until` exclusive; valid_until bounds are inclusive."""
+    for day in range(5):
+        record = VehicleRecord(valid_until=date(2026, 3, 1) + timedelta(days=day))
+        database.record_changes(f"VIN{day}", None, record, START + timedelta(days=day))
+
+    def vins(**kwargs):
+        return [row["vin"] for row in database.query(field="valid_until", **kwargs)]
+
+    assert vins() == ["VIN4", "VIN3", "VIN2", "VIN1", "VIN0"]
+    assert vins(since=START + timedelta(days=1), until=START + timedelta(days=3)) == ["VIN2", "VIN1"]
+    assert vins(valid_from=date(2026, 3, 2), valid_to=date(2026, 3, 4)) == ["VIN3", "VIN2", "VIN1"]
+    # Times in other zones are compared in UTC
+    local = timezone(timedelta(hours=2))
+    assert vins(since=(START + timedelta(days=4)).astimezone(local)) == ["VIN4"]
+
+
+def test_limit(database):
+    """The newest rows are returned up to the limit."""
+    for day in range(5):
+        database.record_changes(VIN, None, RECORD, START + timedelta(days=day))
+    rows = database.query(field="valid_until", limit=2)
+    assert [row["changed_at"][:10] for row in rows] == ["2026-01-05", "2026-01-04"]
+
+
+def test_file_database_is_reopened(tmp_path):
+    """Rows persist across connections to the same file."""
+    path = tmp_path / "history.db"
+    database = HistoryDatabase(path)
+    database.record_changes(VIN, None, RECORD, START)
+    database.close()
+
+    database = HistoryDatabase(path)
+    assert len(database.query(vin=VIN)) == 6
+    database.close()
+
+
+def test_change_shared_by_entries_is_stored_once(loop, database):
+    """Entries tracking the same VIN report one fetched change once."""
+
+    async def add_executor_job(target, *args):
+        return target(*args)
+
+    history = STKHistory(SimpleNamespace(async_add_executor_job=add_executor_job), database)
+
+    async def run():
+        await history.async_record(VIN, RECORD, RENEWED, START)
+        await history.async_record(VIN, RECORD, RENEWED, START + timedelta(seconds=1))
+        await history.async_record(VIN, None, RENEWED, START + timedelta(seconds=2))
+        # The same data of another VIN is its own change
+        await history.async_record(OTHER_VIN, RECORD, RENEWED, START - timedelta(seconds=1))
+
+    loop.run_until_complete(run())
+    assert [row["vin"] for row in database.query(field="valid_until")] == [VIN, OTHER_VIN]
+
+
+def test_failed_write_is_retried(loop, database):
+    """A change that could not be stored is stored on its next report."""
+    calls = []
+
+    async def add_executor_job(target, *args):
+        calls.append(target)
+        if len(calls) == 1:
+            raise sqlite3.OperationalError("database is locked")
+        return target(*args)
+
+    history = STKHistory(SimpleNamespace(async_add_executor_job=add_executor_job), database)
+
+    async def run():
+        await history.async_record(VIN, RECORD, RENEWED, START)
+        await history.async_record(VIN, RECORD, RENEWED, START)
+
+    loop.run_until_complete(run())
+    assert len(database.query(field="valid_until")) == 1
+
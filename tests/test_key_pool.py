@@ -0,0 +1,131 @@
+"""Tests of the API key pool."""
+from types import SimpleNamespace
+
+import pytest
+
+from custom_components.stk_czechr import key_pool as key_pool_module
+from custom_components.stk_czechr.key_pool import ApiKeyPool
+
+VINS = [f"TMBJJ7NE{number:09d}" for number in range(2000)]
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Replace the pool's monotonic clock and record the scheduled callbacks."""
+    clock = SimpleNamespace(now=1000.0, later=[])
+    monkeypatch.setattr(key_pool_module, "time", SimpleNamespace(monotonic=lambda: clock.now))
+    monkeypatch.setattr(
+        key_pool_module,
+        "async_call_later",
+        lambda hass, delay, action: clock.later.append((delay, action)),
+    )
+    return clock
+
+
+def _pool(*keys):
+    pool = ApiKeyPool(None)
+    for api_key in keys:
+        pool.async_add_key(api_key)
+    return pool
+
+
+def _assignment(pool):
+    return {vin: pool.key_for(vin) for vin in VINS}
+
+
+def test_vin_stays_on_its_key():
+    """The mapping is stable and does not depend on the order keys are added."""
+    pool = _pool("key-a", "key-b", "key-c")
+    assignment = _assignment(pool)
+
+    assert assignment == _assignment(pool)
+    assert assignment == _assignment(_pool("key-c", "key-a", "key-b"))
+    assert set(assignment.values()) == {"key-a", "key-b", "key-c"}
+    assert _pool().key_for(VINS[0]) == ""
+
+
+def test_adding_a_key_moves_about_one_share():
+    """Only VINs moving to the new key change, roughly 1/N of them."""
+    pool = _pool("key-a", "key-b", "key-c")
+    before = _assignment(pool)
+
+    pool.async_add_key("key-d")
+    after = _assignment(pool)
+    moved = [vin for vin in VINS if before[vin] != after[vin]]
+    assert {after[vin] for vin in moved} == {"key-d"}
+    assert 0.15 < len(moved) / len(VINS) < 0.35
+
+    pool.async_remove_key("key-d")
+    assert _assignment(pool) == before
+
+
+def test_exhausted_key_is_skipped_until_restored(clock):
+    """VINs of an exhausted key fail over and move back when its quota returns."""
+    pool = _pool("key-a", "key-b", "key-c")
+    notified = []
+    pool.async_add_listener(lambda: notified.append(True))
+    before = _assignment(pool)
+
+    pool.async_mark_exhausted("key-a", 60)
+    during = _assignment(pool)
+    assert "key-a" not in during.values()
+    assert all(during[vin] == before[vin] for vin in VINS if before[vin] != "key-a")
+    assert pool.key_state("key-a") == "exhausted"
+    assert pool.failovers("key-a") == 1
+    assert [delay for delay, _ in clock.later] == [60]
+
+    clock.now += 60
+    clock.later[0][1]()
+    assert _assignment(pool) == before
+    assert pool.key_state("key-a") == "ok"
+    assert len(notified) == 2
+
+
+def test_single_key_is_never_exhausted(clock):
+    """A pool of one key has nowhere to fail over to."""
+    pool = _pool("key-a")
+    pool.async_mark_exhausted("key-a", 60)
+    assert pool.key_state("key-a") == "ok"
+    assert clock.later == []
+
+
+def test_every_key_unavailable_keeps_the_home_key(clock):
+    """With no key available the VIN waits for its own key."""
+    pool = _pool("key-a", "key-b")
+    before = _assignment(pool)
+    pool.async_mark_exhausted("key-a", 60)
+    pool.async_mark_invalid("key-b")
+    assert _assignment(pool) == before
+
+
+def test_invalid_key_is_skipped():
+    """A rejected key serves no VIN until it is added again."""
+    pool = _pool("key-a", "key-b")
+    pool.async_mark_invalid("key-b")
+    assert set(_assignment(pool).values()) == {"key-a"}
+    assert pool.key_state("key-b") == "invalid"
+
+
+def test_permanent_key_survives_removal():
+    """Keys from configuration.yaml stay when entries using them are removed."""
+    pool = _pool("entry-key")
+    pool.async_add_key("entry-key")
+    pool.async_add_key("yaml-key", permanent=True)
+    pool.async_add_key("yaml-key")
+    # A key configured in YAML after an entry already uses it
+    pool.async_add_key("entry-key", permanent=True)
+
+    for _ in range(3):
+        pool.async_remove_key("yaml-key")
+        pool.async_remove_key("entry-key")
+    assert sorted(pool.keys) == ["entry-key", "yaml-key"]
+
+
+def test_entry_key_leaves_with_its_last_entry():
+    """A key shared by two entries is reference counted."""
+    pool = _pool("shared", "shared", "other")
+    pool.async_remove_key("shared")
+    assert "shared" in pool
+    pool.async_remove_key("shared")
+    assert "shared" not in pool
+    assert set(_assignment(pool).values()) == {"other"}
@@ -0,0 +1,157 @@
+"""Golden tests of the table-driven parser against recorded API payloads."""
+from datetime import date
+import json
+from pathlib import Path
+
+import pytest
+
+from custom_components.stk_czechr.models import VehicleRecord
+from custom_components.stk_czechr.parser import (
+    parse_consumption,
+    parse_date,
+    parse_tires,
+    parse_vehicle_data,
+)
+
+PAYLOADS_PATH = Path(__file__).parents[1] / "benchmarks" / "payloads"
+
+# Written from the raw values of each payload, not from the parser output
+EXPECTED = {
+    "passenger_car": VehicleRecord(
+        valid_until=date(2026, 11, 30),
+        brand="ŠKODA",
+        model="OCTAVIA",
+        vin="TMBJJ7NE0J0123456",
+        color="ŠEDÁ",
+        weight=1320,
+        max_weight=1900,
+        max_speed=210,
+        engine_displacement=1968,
+        wheelbase=2680,
+        noise_driving=71,
+        owners_count=1,
+        operators_count=1,
+        tp_number="UI654321",
+        orv_number="UBB654321",
+        engine_power="110/ 3500-4000",
+        fuel_type="NM",
+        vehicle_type="OSOBNÍ AUTOMOBIL",
+        category="M1",
+        status_name="PROVOZOVANÉ",
+        first_registration=date(2018, 3, 1),
+        first_registration_cz=date(2018, 3, 1),
+        length=4689,
+        width=1814,
+        height=1461,
+        consumption_city=5.4,
+        consumption_highway=3.9,
+        consumption_combined=4.4,
+        co2_emissions=142,
+        noise_stationary=75,
+        tires_front="205/55 R16 91V/ 6.5J x 16",
+        tires_rear="205/55 R16 91V/ 6.5J x 16",
+        dimensions="4689/ 1814/ 1461",
+    ),
+    "motorcycle": VehicleRecord(
+        valid_until=date(2027, 5, 14),
+        brand="KTM",
+        model="125 DUKE",
+        vin="VBKJYA409GC123456",
+        color="ORANŽOVÁ",
+        weight=154,
+        max_weight=300,
+        max_speed=118,
+        engine_displacement=124.7,
+        wheelbase=1357,
+        noise_driving=77,
+        owners_count=2,
+        operators_count=2,
+        tp_number="UE123456",
+        orv_number="UBA123456",
+        engine_power="11/ 10500",
+        fuel_type="BA 95 B",
+        vehicle_type="MOTOCYKL",
+        category="L3e",
+        status_name="PROVOZOVANÉ",
+        first_registration=date(2016, 4, 20),
+        first_registration_cz=date(2016, 4, 20),
+        length=2210,
+        width=780,
+        height=1305,
+        consumption_combined=3.5,
+        noise_stationary=87,
+        tires_front="110/70-17 M/C 54H TL/ 3.0 x 17",
+        tires_rear="150/60-17 M/C 66H TL/ 4.0 x 17",
+        dimensions="2210/ 780/ 1305",
+    ),
+    "sparse": VehicleRecord(
+        brand="FORD",
+        vin="WF0AXXGCDA1234567",
+        length=4300,
+        consumption_combined=6.1,
+        dimensions="4300",
+    ),
+}
+
+
+def _recorded_data(name):
+    """Return the "Data" object of a recorded API response."""
+    payload = json.loads((PAYLOADS_PATH / f"{name}.json").read_text(encoding="utf-8"))
+    return payload["response"]["Data"]
+
+
+@pytest.mark.parametrize("name", sorted(EXPECTED))
+def test_parse_recorded_payload(name):
+    """Every recorded payload parses into its golden record."""
+    assert parse_vehicle_data(_recorded_data(name)) == EXPECTED[name]
+
+
+def test_every_payload_has_a_golden_record():
+    """A payload added to the recordings needs an expected record here."""
+    assert {path.stem for path in PAYLOADS_PATH.glob("*.json")} == set(EXPECTED)
+
+
+@pytest.mark.parametrize(
+    ("value", "expected"),
+    [
+        ("2026-11-30", date(2026, 11, 30)),
+        ("2027-05-14T00:00:00", date(2027, 5, 14)),
+        ("1.3.2018", date(2018, 3, 1)),
+        ("31.12.2025", date(2025, 12, 31)),
+        ("", None),
+        (None, None),
+        ("not a date", None),
+        ("31.2.2025", None),
+    ],
+)
+def test_parse_date(value, expected):
+    """API dates, ISO datetimes and Czech export dates are accepted."""
+    assert parse_date(value) == expected
+
+
+@pytest.mark.parametrize(
+    ("value", "expected"),
+    [
+        ("5,4/ 3,9/ 4,4", (5.4, 3.9, 4.4)),
+        (" / / 3.5", (0, 0, 3.5)),
+        ("6.1", (0, 0, 6.1)),
+        ("", (0, 0, 0)),
+        (None, (0, 0, 0)),
+    ],
+)
+def test_parse_consumption(value, expected):
+    """A single value is the combined consumption."""
+    assert parse_consumption(value) == expected
+
+
+@pytest.mark.parametrize(
+    ("value", "expected"),
+    [
+        ("205/55 R16;\n215/50 R17;\n", ("205/55 R16", "215/50 R17")),
+        ("205/55 R16;\n", ("205/55 R16", "")),
+        (None, ("", "")),
+    ],
+)
+def test_parse_tires(value, expected):
+    """Front and rear axle tires are the first two entries."""
+    assert parse_tires(value) == expected
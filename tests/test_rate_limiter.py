@@ -0,0 +1,112 @@
+"""Tests of the shared token-bucket rate limiter."""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from custom_components.stk_czechr import rate_limiter
+from custom_components.stk_czechr.rate_limiter import TokenBucketRateLimiter
+
+
+@pytest.fixture
+def limiter(loop, monkeypatch):
+    """Return a limiter of 2 requests per second whose clock is the loop's."""
+    monkeypatch.setattr(rate_limiter, "time", SimpleNamespace(monotonic=loop.time))
+    return TokenBucketRateLimiter(rate=2, period=1, capacity=1)
+
+
+async def _acquire(loop, limiter, served, name, **kwargs):
+    await limiter.acquire(**kwargs)
+    served.append((name, loop.time()))
+
+
+def test_tokens_follow_rate_and_burst(loop, limiter):
+    """Concurrent callers get one token up front, then one every 1/rate seconds."""
+    served = []
+
+    async def run():
+        await asyncio.gather(*(_acquire(loop, limiter, served, name) for name in range(6)))
+
+    loop.run_until_complete(run())
+
+    assert [name for name, _ in served] == list(range(6))
+    assert [at for _, at in served] == pytest.approx([0.0, 0.5, 1.0, 1.5, 2.0, 2.5])
+    assert limiter.metrics["acquired"] == 6
+    assert limiter.queue_depth == 0
+
+
+def test_priority_waiter_is_served_first(loop, limiter):
+    """A priority request takes the next token ahead of queued routine polls."""
+    served = []
+
+    async def run():
+        routine = [asyncio.ensure_future(_acquire(loop, limiter, served, f"routine{n}")) for n in range(3)]
+        await asyncio.sleep(0)
+        await asyncio.gather(_acquire(loop, limiter, served, "priority", priority=True), *routine)
+
+    loop.run_until_complete(run())
+
+    assert [name for name, _ in served] == ["routine0", "priority", "routine1", "routine2"]
+    assert [at for _, at in served] == pytest.approx([0.0, 0.5, 1.0, 1.5])
+    assert limiter.metrics["priority_acquired"] == 1
+
+
+def test_promoted_waiter_jumps_the_queue(loop, limiter):
+    """Setting the promotion event moves a waiting routine request ahead."""
+    served = []
+    promoted = [asyncio.Event() for _ in range(3)]
+
+    async def run():
+        waiters = [
+            asyncio.ensure_future(_acquire(loop, limiter, served, n, promoted=promoted[n])) for n in range(3)
+        ]
+        await asyncio.sleep(0.1)
+        promoted[2].set()
+        await asyncio.gather(*waiters)
+
+    loop.run_until_complete(run())
+
+    assert [name for name, _ in served] == [0, 2, 1]
+    assert [at for _, at in served] == pytest.approx([0.0, 0.5, 1.0])
+    assert limiter.metrics["priority_acquired"] == 1
+
+
+def test_cancelled_waiter_does_not_leak_a_token(loop, limiter):
+    """A waiter cancelled while it sleeps neither consumes nor frees a token."""
+    served = []
+
+    async def run():
+        await _acquire(loop, limiter, served, "first")
+        cancelled = [
+            asyncio.ensure_future(limiter.acquire()),
+            asyncio.ensure_future(limiter.acquire(promoted=asyncio.Event())),
+        ]
+        await asyncio.sleep(0.1)
+        for waiter in cancelled:
+            waiter.cancel()
+        await asyncio.gather(*cancelled, return_exceptions=True)
+        assert limiter.queue_depth == 0
+        await asyncio.gather(*(_acquire(loop, limiter, served, name) for name in ("second", "third")))
+
+    loop.run_until_complete(run())
+
+    assert [name for name, _ in served] == ["first", "second", "third"]
+    assert [at for _, at in served] == pytest.approx([0.0, 0.5, 1.0])
+    assert limiter.metrics["acquired"] == 3
+
+
+def test_pause_holds_every_lane(loop, limiter):
+    """No token is handed out, even to priority requests, while paused."""
+    served = []
+
+    async def run():
+        limiter.pause(10)
+        await asyncio.gather(
+            _acquire(loop, limiter, served, "routine"),
+            _acquire(loop, limiter, served, "priority", priority=True),
+        )
+
+    loop.run_until_complete(run())
+
+    assert [name for name, _ in served] == ["priority", "routine"]
+    assert [at for _, at in served] == pytest.approx([10.0, 10.5])
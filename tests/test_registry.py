@@ -0,0 +1,172 @@
+"""Tests of the offline VIN index import."""
+import csv
+from datetime import date, datetime, timezone
+import io
+import os
+
+import pytest
+
+from custom_components.stk_czechr.registry import (
+    RegistryDatabase,
+    build_registry,
+    map_columns,
+    split_export,
+)
+
+HEADER = [
+    "PČV",
+    "VIN",
+    "Tovární značka",
+    "Pravidelná technická prohlídka do",
+    "Zdvihový objem [cm3]",
+    "Nápravy pneu ráfky",
+]
+TIRES = '205/55 R16 91V/ 6.5J x 16;\n205/55 R16 "Eco";\n'
+
+
+def _write_export(path, rows, header=HEADER):
+    """Write a semicolon separated export with quoted multi-line fields."""
+    with open(path, "w", encoding="utf-8", newline="") as export:
+        writer = csv.writer(export, delimiter=";")
+        writer.writerow(header)
+        writer.writerows(rows)
+
+
+def _vehicle_rows(count):
+    return [
+        [str(number), f"TMBTEST{number:010d}", "ŠKODA", f"{1 + number % 28}.3.2027", "1968", TIRES]
+        for number in range(count)
+    ]
+
+
+def test_map_columns():
+    """Labels match API field names without diacritics, units or case."""
+    header = ["PČV", "VIN", "Tovární značka", "Zdvihový objem [cm3]", "Datum 1. registrace", "?"]
+    assert map_columns(header) == [
+        (1, "VIN"),
+        (2, "TovarniZnacka"),
+        (3, "MotorZdvihObjem"),
+        (4, "DatumPrvniRegistrace"),
+    ]
+
+
+def test_map_columns_without_vin():
+    """An export without a VIN column is rejected."""
+    with pytest.raises(ValueError):
+        map_columns(["PČV", "Tovární značka"])
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64, 1000, 2**20])
+def test_split_export_keeps_quoted_newlines_in_one_range(tmp_path, chunk_size):
+    """Ranges end only between records, never inside a quoted field."""
+    path = tmp_path / "export.csv"
+    _write_export(path, _vehicle_rows(50))
+
+    header, ranges = split_export(path, chunk_size)
+    content = path.read_bytes()
+
+    assert header.decode().rstrip("\r\n").split(";") == HEADER
+    assert ranges[0][0] == len(header)
+    assert ranges[-1][1] == len(content)
+    assert all(end == start for (_, end), (start, _) in zip(ranges, ranges[1:]))
+    rows = []
+    for start, end in ranges:
+        chunk_rows = list(csv.reader(io.StringIO(content[start:end].decode()), delimiter=";"))
+        assert all(len(row) == len(HEADER) for row in chunk_rows)
+        rows.extend(chunk_rows)
+    assert rows == _vehicle_rows(50)
+    if chunk_size < 64:
+        assert len(ranges) == 50
+
+
+def test_split_export_with_bom(tmp_path):
+    """A UTF-8 byte order mark is not part of the first column label."""
+    path = tmp_path / "export.csv"
+    path.write_bytes(b"\xef\xbb\xbfVIN;Palivo\nTMBTEST0000000001;NM\n")
+    header, ranges = split_export(path)
+    assert header == b"VIN;Palivo\n"
+    assert ranges == [(len(b"\xef\xbb\xbfVIN;Palivo\n"), path.stat().st_size)]
+
+
+@pytest.mark.parametrize("chunk_size", [64, 2**20])
+def test_build_registry(tmp_path, chunk_size):
+    """The latest inspection of each VIN is indexed; rows without a VIN are skipped."""
+    csv_path = tmp_path / "export.csv"
+    database_path = tmp_path / "registry?#%.db"
+    rows = _vehicle_rows(20)
+    rows.insert(5, ["5", "TMBTEST0000000003", "ŠKODA", "1.1.2020", "999", ""])
+    rows.append(["", "", "", "", "", ""])
+    _write_export(csv_path, rows)
+    exported_at = datetime(2026, 10, 1, tzinfo=timezone.utc)
+
+    stats = build_registry(
+        str(csv_path), str(database_path), exported_at, workers=1, chunk_size=chunk_size
+    )
+
+    assert stats["vehicles"] == 20
+    assert stats["rows"] == 21
+    assert stats["skipped"] == 1
+    database = RegistryDatabase(str(database_path))
+    try:
+        assert database.metadata["exported_at"] == exported_at.isoformat()
+        record = database.lookup("TMBTEST0000000003")
+        assert record.valid_until == date(2027, 3, 4)
+        assert record.engine_displacement == 1968
+        assert record.tires_rear == '205/55 R16 "Eco"'
+        assert database.lookup("TMBMISSING0000000") is None
+    finally:
+        database.close()
+
+
+def test_build_registry_without_vin_column(tmp_path):
+    """A failed import raises and leaves neither a database nor temporary files."""
+    csv_path = tmp_path / "export.csv"
+    _write_export(csv_path, [["1", "ŠKODA"]], header=["PČV", "Tovární značka"])
+
+    with pytest.raises(ValueError):
+        build_registry(str(csv_path), str(tmp_path / "registry.db"), workers=1)
+
+    assert os.listdir(tmp_path) == ["export.csv"]
+
+
+def test_build_registry_removes_the_temporary_database_on_error(tmp_path):
+    """An error while normalizing removes the partial index."""
+    csv_path = tmp_path / "export.csv"
+    _write_export(csv_path, _vehicle_rows(3))
+    database_path = tmp_path / "registry.db"
+
+    def _progress(done, total, rows):
+        raise RuntimeError("cancelled")
+
+    with pytest.raises(RuntimeError):
+        build_registry(str(csv_path), str(database_path), workers=1, progress=_progress)
+
+    assert os.listdir(tmp_path) == ["export.csv"]
+
+
+def test_open_unreadable_index(tmp_path):
+    """A corrupt index file disables lookups instead of raising."""
+    database_path = tmp_path / "registry.db"
+    database_path.write_bytes(b"not a database" * 512)
+    database = RegistryDatabase(str(database_path))
+    assert database.metadata == {}
+    assert database.lookup("TMBTEST0000000001") is None
+
+
+def test_build_registry_in_worker_processes(tmp_path):
+    """Spawned workers build the same index as the calling thread."""
+    csv_path = tmp_path / "export.csv"
+    _write_export(csv_path, _vehicle_rows(200))
+    serial = build_registry(str(csv_path), str(tmp_path / "serial.db"), workers=1, chunk_size=512)
+    parallel = build_registry(str(csv_path), str(tmp_path / "parallel.db"), workers=2, chunk_size=512)
+
+    assert parallel["chunks"] > 1
+    assert parallel["vehicles"] == serial["vehicles"] == 200
+    databases = [RegistryDatabase(str(tmp_path / name)) for name in ("serial.db", "parallel.db")]
+    try:
+        for number in range(200):
+            vin = f"TMBTEST{number:010d}"
+            assert databases[0].lookup(vin) == databases[1].lookup(vin) is not None
+    finally:
+        for database in databases:
+            database.close()
@@ -0,0 +1,85 @@
+"""Tests of the retry policy of failed fetches."""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from custom_components.stk_czechr import api
+from custom_components.stk_czechr.api import RetryState, parse_retry_after
+from custom_components.stk_czechr.const import RETRY_BASE_DELAY, RETRY_MAX_DELAY
+
+NOW = datetime(2026, 10, 17, 12, 0, tzinfo=timezone.utc)
+
+
+@pytest.fixture(autouse=True)
+def utcnow(monkeypatch):
+    """Freeze the current time."""
+    monkeypatch.setattr(api.dt_util, "utcnow", lambda: NOW)
+
+
+@pytest.mark.parametrize(
+    ("value", "expected"),
+    [
+        ("120", 120.0),
+        ("1.5", 1.5),
+        ("-5", 0.0),
+        ("Sat, 17 Oct 2026 12:02:00 GMT", 120.0),
+        ("Sat, 17 Oct 2026 12:02:00 -0000", 120.0),
+        ("Sat, 17 Oct 2026 14:02:00 +0200", 120.0),
+        ("Sat, 17 Oct 2026 11:00:00 GMT", 0.0),
+        ("", None),
+        (None, None),
+        ("soon", None),
+    ],
+)
+def test_parse_retry_after(value, expected):
+    """Retry-After is given in delta seconds or as an HTTP date."""
+    assert parse_retry_after(value) == expected
+
+
+def test_backoff_doubles_within_equal_jitter_bounds(monkeypatch):
+    """Half of each backoff is fixed, the other half random, up to the cap."""
+    retry = RetryState()
+    for attempt in range(12):
+        backoff = min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2**attempt)
+        delay = retry.record_failure("timeout")
+        assert backoff / 2 <= delay <= backoff
+    assert retry.attempts == 12
+
+    # The bounds themselves are reached by the extremes of the jitter
+    monkeypatch.setattr(api.random, "uniform", lambda low, high: low)
+    assert RetryState().record_failure("timeout") == RETRY_BASE_DELAY / 2
+    monkeypatch.setattr(api.random, "uniform", lambda low, high: high)
+    assert RetryState().record_failure("timeout") == RETRY_BASE_DELAY
+
+
+def test_retry_after_overrides_backoff():
+    """The server's Retry-After is used as the delay as is."""
+    retry = RetryState()
+    assert retry.record_failure("HTTP 429", status=429, retry_after=300) == 300
+    assert retry.next_retry == NOW + timedelta(seconds=300)
+    assert retry.as_dict() == {
+        "attempts": 1,
+        "delay": 300,
+        "last_error": "HTTP 429",
+        "last_status": 429,
+        "next_retry": "2026-10-17T12:05:00+00:00",
+    }
+
+
+def test_reset_on_success():
+    """A successful fetch clears the failures and restarts the backoff."""
+    retry = RetryState()
+    retry.record_failure("timeout")
+    retry.record_failure("HTTP 503", status=503)
+    assert retry.pending
+
+    retry.reset()
+    assert not retry.pending
+    assert retry.as_dict() == {
+        "attempts": 0,
+        "delay": None,
+        "last_error": None,
+        "last_status": None,
+        "next_retry": None,
+    }
+    assert retry.record_failure("timeout") <= RETRY_BASE_DELAY
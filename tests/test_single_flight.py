@@ -0,0 +1,97 @@
+"""Tests of the coalescing of concurrent fetches."""
+import asyncio
+
+import pytest
+
+from custom_components.stk_czechr.api import SingleFlight
+
+VIN = "TMBJJ7NE0J0123456"
+
+
+class _Fetch:
+    """Count the calls of a slow fetch."""
+
+    def __init__(self, result=None, error=None):
+        self.calls = 0
+        self._result = result
+        self._error = error
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(1)
+        if self._error is not None:
+            raise self._error
+        return self._result
+
+
+def test_concurrent_callers_share_one_call(loop):
+    """Callers of the same VIN and key join the fetch in flight."""
+    single_flight = SingleFlight()
+    fetch = _Fetch({"vin": VIN})
+
+    async def run():
+        results = asyncio.gather(*(single_flight.async_run((VIN, "key"), fetch) for _ in range(3)))
+        await asyncio.sleep(0)
+        assert single_flight.in_flight == 1
+        return await results
+
+    assert loop.run_until_complete(run()) == [{"vin": VIN}] * 3
+    assert fetch.calls == 1
+    assert (single_flight.started, single_flight.coalesced) == (1, 2)
+    assert single_flight.in_flight == 0
+
+
+def test_other_api_key_gets_its_own_call(loop):
+    """A response is never shared with a caller using another API key."""
+    single_flight = SingleFlight()
+    fetch = _Fetch()
+
+    async def run():
+        await asyncio.gather(
+            single_flight.async_run((VIN, "first"), fetch),
+            single_flight.async_run((VIN, "second"), fetch),
+        )
+
+    loop.run_until_complete(run())
+    assert fetch.calls == 2
+    assert single_flight.coalesced == 0
+
+
+def test_exception_reaches_every_caller(loop):
+    """A failed fetch raises in every joined caller and frees the slot."""
+    single_flight = SingleFlight()
+    failing = _Fetch(error=RuntimeError("HTTP 503"))
+    succeeding = _Fetch("fresh")
+
+    async def run():
+        results = await asyncio.gather(
+            *(single_flight.async_run((VIN, "key"), failing) for _ in range(3)),
+            return_exceptions=True,
+        )
+        assert single_flight.in_flight == 0
+        return results, await single_flight.async_run((VIN, "key"), succeeding)
+
+    results, retried = loop.run_until_complete(run())
+    assert [str(result) for result in results] == ["HTTP 503"] * 3
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert (failing.calls, succeeding.calls) == (1, 1)
+    assert retried == "fresh"
+
+
+def test_cancelled_caller_does_not_cancel_the_fetch(loop):
+    """The first caller leaving does not abort the fetch others joined."""
+    single_flight = SingleFlight()
+    fetch = _Fetch("data")
+
+    async def run():
+        first = asyncio.ensure_future(single_flight.async_run((VIN, "key"), fetch))
+        second = asyncio.ensure_future(single_flight.async_run((VIN, "key"), fetch))
+        await asyncio.sleep(0.5)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert loop.run_until_complete(run()) == "data"
+    assert fetch.calls == 1
+    assert single_flight.in_flight == 0
@@ -0,0 +1,102 @@
+"""Tests of VIN validation and the bulk import batch check."""
+import io
+
+import pytest
+
+from custom_components.stk_czechr.services import _iter_csv_rows, validate_vehicle_batch
+from custom_components.stk_czechr.util import normalize_vin, validate_vin, vin_check_digit_valid
+
+# Check digit X matches (North American example VIN)
+CHECKED_VIN = "1M8GDM9AXKP042788"
+# Position 9 used freely, as many European manufacturers do
+EUROPEAN_VIN = "TMBJJ7NE0J0123456"
+OTHER_VIN = "TMBJG7NE5F0654321"
+
+
+@pytest.mark.parametrize(
+    ("vin", "valid"),
+    [
+        (CHECKED_VIN, True),
+        (EUROPEAN_VIN, True),
+        (EUROPEAN_VIN[:16], False),
+        (EUROPEAN_VIN + "7", False),
+        ("TMBJJ7NE0J012345I", False),
+        ("TMBJJ7NE0J012345O", False),
+        ("TMBJJ7NE0J012345Q", False),
+        ("TMBJJ7NE0J01234-6", False),
+        ("", False),
+    ],
+)
+def test_validate_vin(vin, valid):
+    """A VIN has 17 characters and never contains I, O or Q."""
+    assert validate_vin(vin) is valid
+
+
+def test_normalize_vin():
+    """Case and surrounding whitespace do not make a different VIN."""
+    assert normalize_vin("  tmbjj7ne0j0123456\n") == EUROPEAN_VIN
+    assert normalize_vin(None) == ""
+
+
+def test_check_digit():
+    """The 9th character is compared with the ISO 3779 weighted sum."""
+    assert vin_check_digit_valid(CHECKED_VIN)
+    assert vin_check_digit_valid(CHECKED_VIN.lower())
+    assert not vin_check_digit_valid(CHECKED_VIN[:8] + "1" + CHECKED_VIN[9:])
+    assert not vin_check_digit_valid(EUROPEAN_VIN)
+    assert not vin_check_digit_valid("TMBJJ7NE0J012345I")
+
+
+def test_csv_with_header():
+    """A header row names the columns in any order."""
+    lines = io.StringIO("VIN,Name,API_Key\n" f"{EUROPEAN_VIN},Octavia,key\n" f"{OTHER_VIN},,\n")
+    assert list(_iter_csv_rows(lines)) == [
+        {"vin": EUROPEAN_VIN, "name": "Octavia", "api_key": "key"},
+        {"vin": OTHER_VIN},
+    ]
+
+
+def test_csv_without_header():
+    """Without a header the columns are name, VIN and API key."""
+    lines = io.StringIO(
+        "# fleet\n" f"Octavia, {EUROPEAN_VIN} ,key\n" "\n" f"Fabia,{OTHER_VIN}\n"
+    )
+    assert list(_iter_csv_rows(lines)) == [
+        {"name": "Octavia", "vin": EUROPEAN_VIN, "api_key": "key"},
+        {"name": "Fabia", "vin": OTHER_VIN},
+    ]
+
+
+def test_batch_reports_duplicate_and_invalid_rows():
+    """Configured and repeated VINs are duplicates; malformed rows are invalid."""
+    vehicles = [
+        {"vin": EUROPEAN_VIN.lower(), "name": "Octavia"},
+        {"vin": OTHER_VIN},
+        {"vin": f" {OTHER_VIN.lower()} "},
+        {"vin": "TMBJJ7NE0J012345O"},
+        {"name": "No VIN"},
+    ]
+    accepted, report = validate_vehicle_batch(vehicles, {EUROPEAN_VIN}, "default")
+
+    assert accepted == [{"name": OTHER_VIN, "vin": OTHER_VIN, "api_key": "default"}]
+    assert report["duplicate"] == [EUROPEAN_VIN, OTHER_VIN]
+    assert report["invalid"] == ["TMBJJ7NE0J012345O", ""]
+    assert report["check_digit_mismatch"] == [OTHER_VIN]
+
+
+def test_batch_requires_an_api_key():
+    """A row without its own key and without a default key is invalid."""
+    accepted, report = validate_vehicle_batch([{"vin": CHECKED_VIN}], set())
+    assert accepted == []
+    assert report["invalid"] == [CHECKED_VIN]
+
+
+@pytest.mark.parametrize(("strict", "accepted_vins"), [(False, [CHECKED_VIN, EUROPEAN_VIN]), (True, [CHECKED_VIN])])
+def test_batch_strict_check_digit(strict, accepted_vins):
+    """A check digit mismatch is reported, and rejected only in strict mode."""
+    vehicles = [{"vin": CHECKED_VIN, "api_key": "key"}, {"vin": EUROPEAN_VIN, "api_key": "key"}]
+    accepted, report = validate_vehicle_batch(vehicles, set(), strict_check_digit=strict)
+
+    assert [vehicle["vin"] for vehicle in accepted] == accepted_vins
+    assert report["check_digit_mismatch"] == [EUROPEAN_VIN]
+    assert report["duplicate"] == report["invalid"] == []